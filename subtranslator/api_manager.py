@@ -1,14 +1,23 @@
-import os
 import time
+import logging
 import datetime
+import threading
 import google.generativeai as genai
 from subtranslator.config_manager import load_keys_data, save_keys_data
+from subtranslator.providers import GeminiProvider
+from subtranslator.concurrency import is_overload_error
+
+logger = logging.getLogger(__name__)
 
 class APIKeyManager:
-    def __init__(self):
+    def __init__(self, key_store=None, provider=None, limiter=None):
         self.current_index = 0
+        self.key_store = key_store  # Optional SQLiteKeyStore shared with other processes
+        self.provider = provider or GeminiProvider()
+        self.limiter = limiter  # Optional AdaptiveLimiter gating requests in flight
         self.api_keys = []
         self.key_meta = {}  # key: metadata dict
+        self._lock = threading.RLock()
         self.load_keys()
 
     def load_keys(self):
@@ -25,8 +34,20 @@ class APIKeyManager:
                     "cooldown_until": None,
                     "valid": None
                 }
+        if self.key_store:
+            self.key_store.sync_keys(self.api_keys)
+            self._pull_shared_meta()
+
+    def _pull_shared_meta(self):
+        for key, shared in self.key_store.get_meta().items():
+            if key in self.key_meta:
+                for field in ("success", "fail", "last_used", "cooldown_until"):
+                    self.key_meta[key][field] = shared[field]
 
     def save_keys(self):
+        if self.key_store:
+            # Counters live in the shared store; refresh so keys.json is not stale
+            self._pull_shared_meta()
         data = {
             "api_keys": self.api_keys,
             "key_meta": self.key_meta
@@ -39,6 +60,8 @@ class APIKeyManager:
         return key[:6] + "*****" + key[-4:]
 
     def list_keys(self):
+        if self.key_store:
+            self._pull_shared_meta()
         return [
             {
                 "masked": self.mask_key(k),
@@ -79,6 +102,8 @@ class APIKeyManager:
             "cooldown_until": None,
             "valid": True
         }
+        if self.key_store:
+            self.key_store.sync_keys([key])
         self.save_keys()
         return True
 
@@ -91,11 +116,20 @@ class APIKeyManager:
         if to_remove:
             self.api_keys.remove(to_remove)
             self.key_meta.pop(to_remove, None)
+            self.provider.forget_key(to_remove)
+            if self.key_store:
+                self.key_store.forget_key(to_remove)
             self.save_keys()
             return True
         return False
 
     def get_next_key(self):
+        if self.key_store:
+            return self.key_store.lease(self.api_keys)
+        with self._lock:
+            return self._get_next_key()
+
+    def _get_next_key(self):
         if not self.api_keys:
             raise RuntimeError("No API keys configured.")
         start_idx = self.current_index
@@ -112,56 +146,85 @@ class APIKeyManager:
                 raise RuntimeError("All API keys are in cooldown.")
 
     def record_success(self, key):
-        meta = self.key_meta.get(key, {})
-        meta["success"] = meta.get("success", 0) + 1
-        meta["last_used"] = datetime.datetime.utcnow().isoformat()
-        meta["cooldown_until"] = None
-        self.key_meta[key] = meta
-        self.save_keys()
+        if self.key_store:
+            self.key_store.release(key, success=True)
+            return
+        with self._lock:
+            meta = self.key_meta.get(key, {})
+            meta["success"] = meta.get("success", 0) + 1
+            meta["last_used"] = datetime.datetime.utcnow().isoformat()
+            meta["cooldown_until"] = None
+            self.key_meta[key] = meta
+            self.save_keys()
 
     def record_failure(self, key, error_type=None):
-        meta = self.key_meta.get(key, {})
-        meta["fail"] = meta.get("fail", 0) + 1
-        meta["last_used"] = datetime.datetime.utcnow().isoformat()
-        # If rate limit or auth error, cooldown 1 hour
-        if error_type in ("quota", "auth"):
-            meta["cooldown_until"] = datetime.datetime.utcnow().timestamp() + 3600
-        self.key_meta[key] = meta
-        self.save_keys()
+        if self.key_store:
+            self.key_store.release(key, success=False, error_type=error_type)
+            return
+        with self._lock:
+            meta = self.key_meta.get(key, {})
+            meta["fail"] = meta.get("fail", 0) + 1
+            meta["last_used"] = datetime.datetime.utcnow().isoformat()
+            # If rate limit or auth error, cooldown 1 hour
+            if error_type in ("quota", "auth"):
+                meta["cooldown_until"] = datetime.datetime.utcnow().timestamp() + 3600
+            self.key_meta[key] = meta
+            self.save_keys()
 
-    def call_gemini_api(self, model_name, prompt, safety_settings=None, max_retries=None):
+    def call_gemini_api(self, model_name, prompt, safety_settings=None, max_retries=None, system_instruction=None, timeout=None):
         """
         Call Gemini API with key rotation and exponential backoff.
+
+        system_instruction carries the fixed per-job instructions so each
+        prompt only needs the cue payload; providers without system
+        instruction support get it prepended to the prompt instead.
         """
-        if not self.api_keys:
+        if system_instruction and not self.provider.supports_system_instruction:
+            prompt = system_instruction + "\n\n" + prompt
+            system_instruction = None
+        # Offline providers (echo, replay) run without any configured keys
+        keyless = not self.api_keys and not getattr(self.provider, "needs_keys", True)
+        if not self.api_keys and not keyless:
             raise RuntimeError("No API keys configured.")
 
         retries = 0
-        max_retries = max_retries or (3 * len(self.api_keys))
+        max_retries = max_retries or (3 * max(1, len(self.api_keys)))
         delay = 1
 
         for attempt in range(max_retries):
-            key = self.get_next_key()
+            key = None if keyless else self.get_next_key()
+            if self.limiter:
+                self.limiter.acquire()
+            start = time.time()
             try:
-                genai.configure(api_key=key)
-                model = genai.GenerativeModel(model_name)
-                response = model.generate_content(
-                    prompt,
-                    safety_settings=safety_settings or [],
+                response = self.provider.generate(
+                    key, model_name, prompt,
+                    safety_settings=safety_settings,
+                    system_instruction=system_instruction,
+                    timeout=timeout
                 )
-                self.record_success(key)
-                return response
             except Exception as e:
+                if self.limiter:
+                    self.limiter.release(overloaded=is_overload_error(e))
                 err_msg = str(e).lower()
-                if "quota" in err_msg:
+                if not key:
+                    pass
+                elif "quota" in err_msg:
                     self.record_failure(key, "quota")
                 elif "auth" in err_msg:
                     self.record_failure(key, "auth")
                 else:
                     self.record_failure(key, "network")
-                print(f"[API] Error with key {self.mask_key(key)}: {e}")
+                logger.warning(f"[API] Error with key {self.mask_key(key or 'offline')}: {e}")
                 time.sleep(delay)
                 delay = min(delay * 2, 30)
+            else:
+                # Not in the try: a failing record_success must not release the slot twice
+                if self.limiter:
+                    self.limiter.release(latency=time.time() - start)
+                if key:
+                    self.record_success(key)
+                return response
 
         raise RuntimeError("All API keys failed after retries.")
 
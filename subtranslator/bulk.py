@@ -0,0 +1,264 @@
+import os
+import copy
+import json
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from subtranslator.config_manager import BULK_DIR, atomic_write_json
+from subtranslator.concurrency import AdaptiveLimiter
+from subtranslator.translator import load_subtitles, output_paths
+from subtranslator.engine import JobConfig, TranslationEngine, context_lines
+from subtranslator.glossary import terms_in
+from subtranslator.markup import mask_markup, unmask_markup
+from subtranslator.memory import TranslationMemory
+from subtranslator.prompts import build_chunk_prompt, parse_response
+from subtranslator.quality import QualityReport, check_chunk
+
+# Lease owner suffix of bulk requests, so they never wait on each other
+BULK_OWNER_SUFFIX = ":bulk"
+
+logger = logging.getLogger(__name__)
+
+def _write_jsonl(path, records):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+
+def _read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+class LocalBatchProvider:
+    """
+    File-based stand-in for a provider's batch interface.
+
+    submit() drops a request file into directory and returns a batch id;
+    process() answers every pending batch through an APIKeyManager (spare
+    interactive quota, EchoProvider or a cassette replay) and writes the
+    results file that status() and results() read. Batch files are JSON
+    lines of {"key", "model", "system_instruction", "prompt"}; results are
+    {"key", "text"} or {"key", "error"}.
+
+    google-generativeai has no batch endpoint, so requests share the
+    interactive keys. They run behind their own limiter of at most
+    max_in_flight requests, and a new one only starts while the manager's
+    own limiter (if any) has a free slot, so interactive jobs go first.
+    With a shared SQLiteKeyStore, a new one also waits while any other
+    process holds a lease on it, so interactive jobs in other processes
+    go first too.
+    """
+
+    def __init__(self, directory=BULK_DIR, api_manager=None, max_in_flight=2, poll_interval=0.5):
+        self.directory = directory
+        self.api_manager = api_manager
+        self.max_in_flight = max_in_flight
+        self.poll_interval = poll_interval
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, batch_id, kind):
+        return os.path.join(self.directory, f"{batch_id}.{kind}.jsonl")
+
+    def submit(self, requests):
+        batch_id = uuid.uuid4().hex[:12]
+        _write_jsonl(self._path(batch_id, "requests"), requests)
+        return batch_id
+
+    def status(self, batch_id):
+        if os.path.exists(self._path(batch_id, "results")):
+            return "done"
+        if os.path.exists(self._path(batch_id, "requests")):
+            return "pending"
+        return "unknown"
+
+    def results(self, batch_id):
+        return _read_jsonl(self._path(batch_id, "results"))
+
+    def _bulk_manager(self):
+        """
+        Return a view of api_manager with the same keys and provider but a limiter of its own.
+        """
+        # Hedging only adds load, so bulk requests skip a HedgedCaller wrapper
+        base = getattr(self.api_manager, "api_manager", self.api_manager)
+        manager = copy.copy(base)
+        manager.limiter = AdaptiveLimiter(initial=1, max_limit=self.max_in_flight)
+        store = getattr(base, "key_store", None)
+        if store:
+            # Leases under an owner of their own, so interactive leases of this process count as foreign
+            manager.key_store = copy.copy(store)
+            manager.key_store.owner = store.owner + BULK_OWNER_SUFFIX
+        return manager
+
+    def _interactive_busy(self, store=None):
+        interactive = getattr(self.api_manager, "limiter", None)
+        if interactive and interactive.in_flight >= int(interactive.limit):
+            return True
+        return bool(store and store.foreign_leases(exclude_suffix=BULK_OWNER_SUFFIX))
+
+    def _wait_for_interactive(self, store=None):
+        while self._interactive_busy(store):
+            time.sleep(self.poll_interval)
+
+    def process(self):
+        """
+        Answer all pending batches; returns the ids that were completed.
+        """
+        manager = self._bulk_manager()
+
+        def answer(request):
+            self._wait_for_interactive(getattr(manager, "key_store", None))
+            try:
+                response = manager.call_gemini_api(
+                    model_name=request["model"], prompt=request["prompt"],
+                    system_instruction=request.get("system_instruction")
+                )
+                return {"key": request["key"], "text": response.text}
+            except Exception as e:
+                return {"key": request["key"], "error": str(e)}
+
+        completed = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".requests.jsonl"):
+                continue
+            batch_id = name[:-len(".requests.jsonl")]
+            if self.status(batch_id) != "pending":
+                continue
+            with ThreadPoolExecutor(max_workers=max(1, self.max_in_flight)) as executor:
+                results = list(executor.map(answer, _read_jsonl(self._path(batch_id, "requests"))))
+            _write_jsonl(self._path(batch_id, "results"), results)
+            logger.info(f"[Bulk] Batch {batch_id}: {len(results)} requests answered")
+            completed.append(batch_id)
+        return completed
+
+def submit_bulk(api_manager, batch_provider, input_paths, config, directory=BULK_DIR):
+    """
+    Serialize every chunk request of a backlog and submit it as one batch job.
+
+    Uses the first model of config.model. Memory hits are resolved now and
+    kept in the manifest. Returns the job id to pass to collect_bulk().
+    """
+    engine = TranslationEngine(api_manager)
+    cascade = engine.cascade(config)
+    files = [load_subtitles(path) for path in input_paths]
+    glossary, system_instruction = engine.prepare(cascade, config, [sub.text for subs in files for sub in subs])
+    memory = None
+    if config.memory_file:
+        memory = TranslationMemory(
+            config.memory_file, config.target_lang, config.censorship_level, config.style_notes
+        )
+    requests = []
+    manifest_files = []
+    for file_num, (path, subs) in enumerate(zip(input_paths, files)):
+        masked = [mask_markup(sub.text) for sub in subs]
+        served, hints = {}, {}
+        if memory:
+            served, hints = engine.use_memory(memory, subs, masked, None, glossary)
+        masked, batches = engine.plan(subs, config, skip=served, masked=masked)
+        texts = [plain for plain, _ in masked]
+        for batch_num, batch in enumerate(batches):
+            requests.append({
+                "key": f"{file_num}:{batch_num}",
+                "model": cascade.models[0],
+                "system_instruction": system_instruction,
+                "prompt": build_chunk_prompt(
+                    batch, terms_in(glossary, [text for _, text in batch]),
+                    dict(hints[idx] for idx, _ in batch if idx in hints),
+                    context_lines(batch, texts, config.context_size) if engine.uses_context(config) else None
+                )
+            })
+        manifest_files.append({
+            "path": os.path.abspath(path),
+            "served": {str(idx): subs[idx].text for idx in served},
+            "batches": [[idx for idx, _ in batch] for batch in batches]
+        })
+    job_id = batch_provider.submit(requests)
+    os.makedirs(directory, exist_ok=True)
+    atomic_write_json(os.path.join(directory, f"{job_id}.manifest.json"), {
+        "job_id": job_id,
+        "target_lang": config.target_lang,
+        "model": cascade.models,
+        "censorship_level": config.censorship_level,
+        "style_notes": config.style_notes,
+        "memory_file": config.memory_file,
+        "submitted_at": time.time(),
+        "files": manifest_files
+    })
+    logger.info(f"[Bulk] Submitted {len(requests)} requests for {len(input_paths)} files as {job_id}")
+    return job_id
+
+def collect_bulk(batch_provider, job_id, output_dir, directory=BULK_DIR, api_manager=None):
+    """
+    Merge a finished batch job into translated files in output_dir.
+
+    Answers pass the same quality checks as interactive jobs. With an
+    api_manager, cues that fail them (or whose request failed) are
+    re-translated interactively; otherwise they are only reported.
+    Returns (out_paths, report) or None while the batch is still running.
+    """
+    if batch_provider.status(job_id) != "done":
+        return None
+    with open(os.path.join(directory, f"{job_id}.manifest.json"), "r") as f:
+        manifest = json.load(f)
+    answers = {result["key"]: result for result in batch_provider.results(job_id)}
+    memory = None
+    if manifest.get("memory_file"):
+        memory = TranslationMemory(
+            manifest["memory_file"], manifest["target_lang"],
+            manifest.get("censorship_level"), manifest.get("style_notes")
+        )
+    report = QualityReport()
+    out_paths = output_paths([entry["path"] for entry in manifest["files"]], output_dir)
+    for file_num, entry in enumerate(manifest["files"]):
+        subs = load_subtitles(entry["path"])
+        masked = [mask_markup(sub.text) for sub in subs]
+        suspect_indices = []
+        for idx, text in entry["served"].items():
+            subs[int(idx)].text = text
+        for batch_num, indices in enumerate(entry["batches"]):
+            answer = answers.get(f"{file_num}:{batch_num}", {})
+            if answer.get("error"):
+                logger.warning(f"[Bulk] {os.path.basename(entry['path'])} batch {batch_num + 1} failed: {answer['error']}")
+            translated = {
+                idx: text for idx, text in parse_response(answer.get("text") or "").items() if idx in indices
+            }
+            suspects = check_chunk({idx: masked[idx] for idx in indices}, translated, manifest["target_lang"])
+            suspect_indices.extend(suspects)
+            for idx, text in translated.items():
+                # An empty answer would blank the cue; keep the source text instead
+                if text.strip():
+                    subs[idx].text = unmask_markup(text, masked[idx][1])
+            if memory:
+                memory.add([(masked[idx][0], text) for idx, text in translated.items() if idx not in suspects])
+            remaining = suspects
+            if api_manager:
+                remaining = {}
+            report.add(len(indices), suspects, [], [f"{file_num}:{idx}" for idx in remaining],
+                       requeued=bool(api_manager))
+        if api_manager and suspect_indices:
+            # Same path as an interactive re-translation of a few cues, run on a clean source copy
+            config = JobConfig(
+                manifest["target_lang"], manifest["model"],
+                censorship_level=manifest.get("censorship_level"), style_notes=manifest.get("style_notes"),
+                memory_file=manifest.get("memory_file")
+            )
+            source_subs = load_subtitles(entry["path"])
+            failed = set()
+
+            def on_event(event):
+                if event["type"] == "batch" and event["failed"]:
+                    failed.update(event["indices"])
+
+            result = TranslationEngine(api_manager).run(
+                source_subs, config, indices=sorted(suspect_indices), on_event=on_event
+            )
+            # Cues still suspect (or whose request failed) keep the batch answer
+            remaining = set(result["quality"]["remaining"]) | failed
+            fixed = [idx for idx in suspect_indices if idx not in remaining]
+            for idx in fixed:
+                subs[idx].text = source_subs[idx].text
+            report.add(0, {}, fixed, [f"{file_num}:{idx}" for idx in sorted(remaining)], requeued=False)
+        os.makedirs(os.path.dirname(out_paths[file_num]), exist_ok=True)
+        subs.save(out_paths[file_num], encoding='utf-8')
+    return out_paths, report.as_dict()
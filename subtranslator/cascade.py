@@ -0,0 +1,74 @@
+import logging
+import threading
+from subtranslator.prompts import parse_response
+
+logger = logging.getLogger(__name__)
+
+class ModelCascade:
+    """
+    Route each chunk through an ordered list of models, cheapest first.
+
+    A chunk moves to the next model only if the current one errors or times
+    out, is safety-blocked, or returns fewer than min_coverage of the
+    expected cue ids. The last model's answer is accepted as is. Routing
+    decisions are logged and counted per model.
+    """
+
+    def __init__(self, models, min_coverage=0.9, tier_retries=2, timeout=None):
+        if isinstance(models, str):
+            models = [m.strip() for m in models.split(",") if m.strip()]
+        if not models:
+            raise ValueError("ModelCascade needs at least one model.")
+        self.models = list(models)
+        self.min_coverage = min_coverage
+        self.tier_retries = tier_retries  # Key retries before escalating from a non-final tier
+        self.timeout = timeout
+        self.counts = {m: {"served": 0, "failed": 0, "blocked": 0, "malformed": 0} for m in self.models}
+        self._lock = threading.Lock()
+
+    def _count(self, model, outcome):
+        with self._lock:
+            self.counts[model][outcome] += 1
+
+    def translate(self, api_manager, prompt, expected_ids, label="", **kwargs):
+        """
+        Return {id: text} from the first model whose answer passes validation.
+        """
+        expected_ids = set(expected_ids)
+        parsed = {}
+        for tier, model in enumerate(self.models):
+            last = tier == len(self.models) - 1
+            call_kwargs = dict(kwargs)
+            if not last:
+                call_kwargs["max_retries"] = self.tier_retries
+            if self.timeout:
+                call_kwargs["timeout"] = self.timeout
+            try:
+                response = api_manager.call_gemini_api(model_name=model, prompt=prompt, **call_kwargs)
+            except Exception as e:
+                self._count(model, "failed")
+                outcome = f"failed ({e})"
+            else:
+                try:
+                    text = response.text
+                except Exception:
+                    # .text raises when the candidate was blocked
+                    text = None
+                if text is None:
+                    self._count(model, "blocked")
+                    outcome = "blocked"
+                else:
+                    parsed = {k: v for k, v in parse_response(text).items() if k in expected_ids}
+                    coverage = len(parsed) / len(expected_ids) if expected_ids else 1.0
+                    if coverage >= self.min_coverage or last:
+                        self._count(model, "served")
+                        return parsed
+                    self._count(model, "malformed")
+                    outcome = f"malformed ({len(parsed)}/{len(expected_ids)} cues)"
+            if last:
+                raise RuntimeError(f"All models in cascade failed; last: {outcome}")
+            logger.info(f"[Cascade] {label}{model} {outcome} -> {self.models[tier + 1]}")
+
+    def stats(self):
+        with self._lock:
+            return {m: dict(c) for m, c in self.counts.items()}
@@ -0,0 +1,227 @@
+import gzip
+import json
+import time
+import zlib
+import hashlib
+import threading
+from collections import defaultdict, deque
+from subtranslator.providers import ProviderResponse
+
+def _digest(*parts):
+    return hashlib.sha1("\x00".join(p or "" for p in parts).encode("utf-8")).hexdigest()[:16]
+
+class RecordingProvider:
+    """
+    Provider wrapper that records every request to a gzip-compressed JSON-lines cassette.
+
+    Sits where APIKeyManager.call_gemini_api hands a request to the provider,
+    so each attempt is recorded: model, prompt, response text (None when
+    blocked), error and latency. System instructions are stored once and
+    referenced by hash; API keys are never written. The file stays open
+    for the whole session; call close() when done.
+    """
+
+    def __init__(self, provider, path):
+        self.provider = provider
+        self.path = path
+        self.supports_system_instruction = provider.supports_system_instruction
+        self.needs_keys = getattr(provider, "needs_keys", True)
+        self._lock = threading.Lock()
+        self._instructions = set()
+        self._start = time.time()
+        self._file = None
+
+    def forget_key(self, key):
+        self.provider.forget_key(key)
+
+    def _write(self, records):
+        with self._lock:
+            if self._file is None:
+                # One gzip member per session, appended after those of earlier sessions
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # A sync flush keeps finished records readable if the process is killed
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def generate(self, key, model_name, prompt, safety_settings=None, system_instruction=None, timeout=None):
+        records = []
+        instruction_id = None
+        if system_instruction:
+            instruction_id = _digest(system_instruction)
+            with self._lock:
+                is_new = instruction_id not in self._instructions
+                self._instructions.add(instruction_id)
+            if is_new:
+                records.append({"instruction": instruction_id, "text": system_instruction})
+        record = {
+            "model": model_name,
+            "instruction_id": instruction_id,
+            "prompt": prompt,
+            "offset": round(time.time() - self._start, 3),
+            "text": None,
+            "error": None
+        }
+        start = time.time()
+        try:
+            response = self.provider.generate(
+                key, model_name, prompt, safety_settings=safety_settings,
+                system_instruction=system_instruction, timeout=timeout
+            )
+        except Exception as e:
+            record["error"] = str(e)
+            raise
+        else:
+            try:
+                record["text"] = response.text
+            except Exception:
+                record["blocked"] = True
+            return response
+        finally:
+            record["latency"] = round(time.time() - start, 3)
+            records.append(record)
+            self._write(records)
+
+_MAGIC = b"\x1f\x8b\x08"
+
+def _decompress_member(data, start):
+    """
+    Decompress the gzip member at start; return (bytes, end, failed_at).
+
+    end is where the next member begins, or None when this one is cut short
+    or corrupt. failed_at is the offset where decoding broke, if it did.
+    """
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    out = []
+    pos = start
+    while pos < len(data) and not d.eof:
+        chunk = data[pos:pos + 4096]
+        saved = d.copy()
+        try:
+            out.append(d.decompress(chunk))
+        except zlib.error:
+            # Replay the chunk byte by byte to keep everything before the bad byte
+            d = saved
+            for i in range(len(chunk)):
+                try:
+                    out.append(d.decompress(chunk[i:i + 1]))
+                except zlib.error:
+                    return b"".join(out), None, pos + i
+            return b"".join(out), None, pos + len(chunk)
+        pos += len(chunk)
+    if d.eof:
+        return b"".join(out), len(data) - len(d.unused_data), None
+    return b"".join(out), None, None
+
+def load_cassette(path):
+    """
+    Return (instructions, records) from a cassette file.
+
+    Members are read one at a time. A session that was never closed lacks
+    its gzip trailer; the records it flushed are still returned, and so are
+    those of any session appended after it.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = []
+    start = 0
+    while start < len(data):
+        raw, end, failed_at = _decompress_member(data, start)
+        text = raw.decode("utf-8", errors="replace")
+        if end is None and not text.endswith("\n"):
+            # Drop a record that was cut off mid-write
+            text = text[:text.rfind("\n") + 1]
+        lines.extend(text.splitlines())
+        if end is not None:
+            start = end
+        elif failed_at is not None:
+            # An unclosed member runs into the header of the next session
+            start = data.rfind(_MAGIC, start + 1, failed_at + len(_MAGIC))
+            if start < 0:
+                break
+        else:
+            break
+    instructions = {}
+    records = []
+    for line in lines:
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        if "instruction" in entry:
+            instructions[entry["instruction"]] = entry["text"]
+        else:
+            records.append(entry)
+    return instructions, records
+
+class _BlockedResponse:
+    @property
+    def text(self):
+        raise ValueError("Response was blocked (replayed from cassette).")
+
+class ReplayProvider:
+    """
+    Provider that serves recorded responses instead of calling an API.
+
+    Needs no API keys, so jobs can be replayed fully offline through the
+    normal APIKeyManager path (retries, limiter, hedging included).
+
+    Requests are matched on (model, system instruction, prompt); repeated
+    prompts replay in recorded order. Unmatched requests take the next
+    unused record when fallback is "sequential" (useful when a scheduler
+    change reshapes prompts) or raise when it is "error". Each reply waits
+    the recorded latency times time_scale (0 for as fast as possible).
+    """
+    supports_system_instruction = True
+    needs_keys = False
+
+    def __init__(self, path, time_scale=1.0, fallback="sequential"):
+        self.time_scale = time_scale
+        self.fallback = fallback
+        instructions, self.records = load_cassette(path)
+        self._by_request = defaultdict(deque)
+        for num, record in enumerate(self.records):
+            instruction = instructions.get(record.get("instruction_id"))
+            self._by_request[_digest(record["model"], instruction, record["prompt"])].append(num)
+        self._unused = deque(range(len(self.records)))
+        self._served = set()
+        self._lock = threading.Lock()
+        self.matched = 0
+        self.unmatched = 0
+
+    def forget_key(self, key):
+        pass
+
+    def _take(self, model_name, prompt, system_instruction):
+        with self._lock:
+            queue = self._by_request.get(_digest(model_name, system_instruction, prompt))
+            while queue:
+                num = queue.popleft()
+                if num not in self._served:
+                    self._served.add(num)
+                    self.matched += 1
+                    return self.records[num]
+            if self.fallback != "sequential":
+                raise RuntimeError("No recorded response for this request.")
+            while self._unused:
+                num = self._unused.popleft()
+                if num not in self._served:
+                    self._served.add(num)
+                    self.unmatched += 1
+                    return self.records[num]
+        raise RuntimeError("Cassette exhausted.")
+
+    def generate(self, key, model_name, prompt, safety_settings=None, system_instruction=None, timeout=None):
+        record = self._take(model_name, prompt, system_instruction)
+        if self.time_scale:
+            time.sleep(record.get("latency", 0) * self.time_scale)
+        if record.get("error"):
+            raise RuntimeError(record["error"])
+        if record.get("blocked") or record.get("text") is None:
+            return _BlockedResponse()
+        return ProviderResponse(record["text"])
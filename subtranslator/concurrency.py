@@ -0,0 +1,83 @@
+import time
+import threading
+
+OVERLOAD_MARKERS = ("quota", "429", "resource exhausted", "rate limit", "deadline", "timeout", "timed out")
+
+def is_overload_error(error):
+    """
+    True for errors that mean "back off": rate limits and timeouts.
+    """
+    msg = str(error).lower()
+    return any(marker in msg for marker in OVERLOAD_MARKERS)
+
+class AdaptiveLimiter:
+    """
+    AIMD limit on requests in flight.
+
+    Every healthy response adds 1/limit (so roughly +1 per full window of
+    requests); a 429, timeout or latency spike multiplies the limit by
+    decrease. Decreases are spaced by backoff_interval so one burst of
+    concurrent failures counts as a single congestion signal. A latency
+    spike is a response slower than spike_factor times the running average
+    of recent latencies.
+    """
+
+    def __init__(self, initial=2, min_limit=1, max_limit=32, decrease=0.5,
+                 spike_factor=2.5, backoff_interval=5.0, warmup=5):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.spike_factor = spike_factor
+        self.backoff_interval = backoff_interval
+        self.warmup = warmup
+        self.in_flight = 0
+        self.avg_latency = None
+        self.samples = 0
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def _back_off(self):
+        now = time.time()
+        if now - self._last_decrease >= self.backoff_interval:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+            self.decreases += 1
+            self._last_decrease = now
+
+    def release(self, latency=None, overloaded=False):
+        with self._cond:
+            self.in_flight -= 1
+            if overloaded:
+                self._back_off()
+            elif latency is not None:
+                spike = (
+                    self.samples >= self.warmup
+                    and latency > self.spike_factor * self.avg_latency
+                )
+                # Spikes still feed the average so a lasting slowdown becomes the new baseline
+                self.avg_latency = latency if self.avg_latency is None else 0.9 * self.avg_latency + 0.1 * latency
+                self.samples += 1
+                if spike:
+                    self._back_off()
+                elif self.limit < self.max_limit:
+                    self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                    self.increases += 1
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "avg_latency": round(self.avg_latency, 3) if self.avg_latency is not None else None,
+                "increases": self.increases,
+                "decreases": self.decreases
+            }
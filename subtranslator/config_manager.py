@@ -6,6 +6,11 @@ import shutil
 CONFIG_DIR = os.path.expanduser("~/.config/subtranslator")
 KEYS_FILE = os.path.join(CONFIG_DIR, "keys.json")
 LOG_FILE = os.path.join(CONFIG_DIR, "subtranslator.log")
+WATCH_STATE_FILE = os.path.join(CONFIG_DIR, "watch_state.json")
+JOBS_FILE = os.path.join(CONFIG_DIR, "jobs.json")
+JOBS_DIR = os.path.join(CONFIG_DIR, "jobs")
+KEY_STATE_DB = os.path.join(CONFIG_DIR, "key_state.db")
+BULK_DIR = os.path.join(CONFIG_DIR, "bulk")
 
 # Encryption toggle (stub for now)
 ENCRYPTION_ENABLED = False
@@ -54,3 +59,16 @@ def get_keys_file():
 def get_log_file():
     ensure_config()
     return LOG_FILE
+
+def load_state_file(path):
+    """Load a JSON state file, returning an empty dict if it is missing or corrupt."""
+    ensure_config()
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state_file(path, data):
+    ensure_config()
+    atomic_write_json(path, data)
@@ -0,0 +1,483 @@
+import time
+import bisect
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from subtranslator.markup import mask_markup, unmask_markup
+from subtranslator.prompts import build_system_instruction, build_chunk_prompt
+from subtranslator.cascade import ModelCascade
+from subtranslator.glossary import Glossary, terms_in
+from subtranslator.segmenter import split_scenes
+from subtranslator.memory import TranslationMemory
+from subtranslator.quality import QualityReport, check_chunk, check_cue
+
+logger = logging.getLogger(__name__)
+
+def batch_subtitles(subs, max_chars=2000, context_size=2, texts=None, indices=None):
+    """
+    Yield batches of subtitle entries as text chunks.
+
+    texts overrides the text sent for each entry (e.g. markup-masked text).
+    indices limits the entries yielded. Each entry carries only its own
+    text; context_lines() gives the neighbours to send alongside, and
+    max_chars leaves room for them.
+    """
+    if texts is None:
+        texts = [sub.text for sub in subs]
+    wanted = set(indices) if indices is not None else None
+    batch = []
+    batch_len = 0
+    for idx, text in enumerate(texts):
+        if wanted is not None and idx not in wanted:
+            continue
+        context_len = sum(len(texts[i]) for i in range(max(0, idx - context_size), idx))
+        if batch_len + len(text) + context_len > max_chars and batch:
+            yield batch
+            batch = []
+            batch_len = 0
+
+        batch.append((idx, text))
+        batch_len += len(text) + context_len
+
+    if batch:
+        yield batch
+
+def context_lines(batch, texts, context_size=2):
+    """
+    Return the texts of the context_size entries before each entry of batch, minus the batch itself.
+    """
+    in_batch = {idx for idx, _ in batch}
+    before = {idx - offset for idx, _ in batch for offset in range(1, context_size + 1) if idx - offset >= 0}
+    return [texts[idx] for idx in sorted(before - in_batch)]
+
+def _answered(translated):
+    """Drop empty answers, so the cue keeps its source text rather than being blanked."""
+    return {entry_id: text for entry_id, text in translated.items() if text.strip()}
+
+def _log_quality(quality):
+    if quality["requeued"]:
+        logger.info(
+            f"[Quality] {quality['requeued']} of {quality['checked']} cues re-queued "
+            f"({', '.join(f'{k}: {v}' for k, v in sorted(quality['problems'].items()))}); "
+            f"{quality['fixed']} fixed, {len(quality['remaining'])} still suspect"
+        )
+
+class JobConfig:
+    """
+    Everything that describes how one file should be translated.
+
+    model may be a single model, a comma-separated string, a list or a
+    ModelCascade. censorship_level is None, 'low', 'medium', 'high' or 'mask'.
+    glossary maps terms to fixed translations; with auto_glossary recurring
+    terms are also extracted and translated once per job, and glossary_file
+    keeps those translations for the next episodes of a series.
+    segmentation "scenes" cuts files at scene and dialogue boundaries and
+    sends no context lines; "context" uses fixed-size chunks and sends the
+    context_size cues before each entry as unnumbered reference lines. memory_file is a translation
+    memory (see TranslationMemory) that serves near-duplicate lines without
+    a request and learns from every translated chunk. quality_gate checks
+    every answer locally and re-queues only the suspect cues, once.
+    Scattered re-translations always use "context" batching.
+    cascade_timeout is the per-request timeout in seconds after which a
+    chunk moves on to the next model of the cascade.
+    """
+
+    def __init__(self, target_lang, model, censorship_level=None, glossary=None, style_notes=None,
+                 max_workers=1, max_chars=2000, context_size=2, safety_settings=None,
+                 auto_glossary=False, glossary_file=None, segmentation="scenes", memory_file=None,
+                 quality_gate=True, cascade_timeout=None):
+        self.target_lang = target_lang
+        self.model = model
+        self.censorship_level = censorship_level
+        self.glossary = glossary
+        self.auto_glossary = auto_glossary or bool(glossary_file)
+        self.glossary_file = glossary_file
+        self.segmentation = segmentation
+        self.memory_file = memory_file
+        self.quality_gate = quality_gate
+        self.cascade_timeout = cascade_timeout
+        self.style_notes = style_notes
+        self.max_workers = max_workers
+        self.max_chars = max_chars
+        self.context_size = context_size
+        self.safety_settings = safety_settings
+
+class TranslationEngine:
+    """
+    The one translation pipeline shared by the TUI, CLI modes and server.
+
+    run() translates parsed cues in place and reports progress through an
+    on_event callback invoked on the calling thread; stream() exposes the
+    same events as an async iterator. Events are dicts:
+
+        {"type": "batch", "batch": n, "indices": [...], "failed": bool,
+         "error": str|None, "elapsed": s, "done": cues, "total": cues,
+         "batches_done": n, "batches_total": n}
+        {"type": "done", "routing": {...}, "failed_batches": n, "untranslated": cues, "elapsed": s,
+         "memory": {"exact": n, "substituted": n, "hints": n},
+         "quality": {"checked": n, "problems": {...}, "requeued": n, "fixed": n, "remaining": [...]}}
+
+    Cues served from the translation memory are reported with the batch
+    whose span of the timeline they fall in.
+    """
+
+    def __init__(self, api_manager):
+        self.api_manager = api_manager
+
+    def plan(self, subs, config, indices=None, skip=None, masked=None):
+        """
+        Return (masked, batches) without calling the API.
+
+        Scattered re-translations (indices) always use context batching, as
+        isolated cues need their neighbours. Cues in skip are left out.
+        """
+        if masked is None:
+            masked = [mask_markup(sub.text) for sub in subs]
+        texts = [plain for plain, _ in masked]
+        wanted = indices
+        if skip:
+            wanted = [i for i in (indices if indices is not None else range(len(subs))) if i not in skip]
+        if not self.uses_context(config, indices):
+            batches = list(split_scenes(subs, max_chars=config.max_chars, texts=texts, indices=wanted))
+        else:
+            batches = list(batch_subtitles(
+                subs, max_chars=config.max_chars, context_size=config.context_size,
+                texts=texts, indices=wanted
+            ))
+        return masked, batches
+
+    def cascade(self, config):
+        """
+        Return the ModelCascade for config.model, building one if it is a model name or list.
+        """
+        if isinstance(config.model, ModelCascade):
+            return config.model
+        return ModelCascade(config.model, timeout=config.cascade_timeout)
+
+    def uses_context(self, config, indices=None):
+        """
+        True if plan() batches need context_lines() sent with them.
+        """
+        return config.segmentation != "scenes" or indices is not None
+
+    def prepare(self, cascade, config, texts):
+        """
+        Return (glossary, system_instruction) for a job over the given source texts.
+        """
+        glossary = {}
+        if config.auto_glossary:
+            glossary = Glossary(config.glossary_file).prepare(
+                self.api_manager, cascade, texts, config.target_lang
+            )
+        glossary.update(config.glossary or {})
+        system_instruction = build_system_instruction(
+            config.target_lang, config.censorship_level,
+            style_notes=config.style_notes, chunk_glossary=bool(glossary)
+        )
+        return glossary, system_instruction
+
+    def _translate_chunk(self, cascade, config, system_instruction, entries, glossary, hints, label, context=None):
+        """
+        Send one request for (id, text) entries; returns {id: text}.
+        """
+        # Only the terms this chunk uses, so prompts stay small
+        chunk_glossary = terms_in(glossary, [text for _, text in entries])
+        return cascade.translate(
+            self.api_manager, build_chunk_prompt(entries, chunk_glossary, dict(hints), context),
+            [entry_id for entry_id, _ in entries],
+            label=label,
+            safety_settings=config.safety_settings,
+            system_instruction=system_instruction
+        )
+
+    def _translate_checked(self, cascade, config, system_instruction, entries, glossary, hints, label,
+                           sources, report, context=None):
+        """
+        Like _translate_chunk, then re-queue the cues that fail the local quality checks.
+
+        sources maps each id to its (masked_text, table). Returns
+        (translated, remaining) where remaining are ids still suspect.
+        Empty answers are left out of translated, so those cues keep their
+        source text.
+        """
+        translated = self._translate_chunk(
+            cascade, config, system_instruction, entries, glossary, hints, label, context
+        )
+        if not config.quality_gate:
+            return _answered(translated), []
+        suspects = check_chunk(sources, translated, config.target_lang)
+        fixed = []
+        remaining = []
+        if suspects:
+            logger.info(f"[Quality] {label}re-queuing {len(suspects)} suspect cues")
+            try:
+                retried = self._translate_chunk(
+                    cascade, config, system_instruction,
+                    [entry for entry in entries if entry[0] in suspects], glossary, hints, label, context
+                )
+            except Exception as e:
+                logger.warning(f"[Quality] {label}re-queue failed: {e}")
+                retried = {}
+            for entry_id in suspects:
+                source, table = sources[entry_id]
+                if entry_id in retried and not check_cue(source, retried[entry_id], table, config.target_lang):
+                    translated[entry_id] = retried[entry_id]
+                    fixed.append(entry_id)
+                else:
+                    remaining.append(entry_id)
+        report.add(len(sources), suspects, fixed, remaining)
+        return _answered(translated), remaining
+
+    def use_memory(self, memory, subs, masked, indices, glossary):
+        """
+        Apply memory hits to subs; returns (served {idx: kind}, hints {idx: (source, target)}).
+        """
+        served = {}
+        hints = {}
+        for idx in (indices if indices is not None else range(len(subs))):
+            kind, found = memory.lookup(masked[idx][0], glossary)
+            if kind == "hint":
+                hints[idx] = found
+            elif kind:
+                subs[idx].text = unmask_markup(found, masked[idx][1])
+                served[idx] = kind
+        return served, hints
+
+    def run(self, subs, config, indices=None, on_event=None):
+        """
+        Translate subs in place; returns the final "done" event.
+        """
+        job_start = time.time()
+        cascade = self.cascade(config)
+        glossary, system_instruction = self.prepare(cascade, config, [sub.text for sub in subs])
+        masked = [mask_markup(sub.text) for sub in subs]
+        memory = None
+        served, hints = {}, {}
+        if config.memory_file:
+            memory = TranslationMemory(
+                config.memory_file, config.target_lang, config.censorship_level, config.style_notes
+            )
+            served, hints = self.use_memory(memory, subs, masked, indices, glossary)
+        masked, batches = self.plan(subs, config, indices, skip=served, masked=masked)
+        texts = [plain for plain, _ in masked]
+        with_context = self.uses_context(config, indices)
+        if served and not batches:
+            batches = [[]]
+        # Memory hits ride along with the batch whose span they fall in, so events stay in timeline order
+        attached = {}
+        starts = [batch[0][0] for batch in batches if batch]
+        for idx in served:
+            attached.setdefault(max(0, bisect.bisect_right(starts, idx) - 1), []).append(idx)
+        total = sum(len(batch) for batch in batches) + len(served)
+        report = QualityReport()
+
+        def translate_batch(batch_num, batch):
+            start = time.time()
+            if not batch:
+                return batch, None, 0.0, 0
+            try:
+                translated, suspect = self._translate_checked(
+                    cascade, config, system_instruction, batch, glossary,
+                    [hints[idx] for idx, _ in batch if idx in hints], f"Batch {batch_num + 1}: ",
+                    {idx: masked[idx] for idx, _ in batch}, report,
+                    context_lines(batch, texts, config.context_size) if with_context else None
+                )
+            except Exception as e:
+                logger.warning(f"Batch {batch_num + 1} translation failed: {e}")
+                return batch, str(e), time.time() - start, len(batch)
+            for idx, text in translated.items():
+                subs[idx].text = unmask_markup(text, masked[idx][1])
+            if memory:
+                try:
+                    memory.add([(masked[idx][0], text) for idx, text in translated.items() if idx not in suspect])
+                except Exception as e:
+                    logger.warning(f"[Memory] Could not store batch {batch_num + 1}: {e}")
+            return batch, None, time.time() - start, sum(1 for idx, _ in batch if not translated.get(idx, "").strip())
+
+        done = 0
+        failed = 0
+        untranslated = 0
+        with ThreadPoolExecutor(max_workers=max(1, config.max_workers)) as executor:
+            # Submitted in timeline order, so the start of the file comes back first
+            futures = {executor.submit(translate_batch, n, batch): n for n, batch in enumerate(batches)}
+            for batches_done, future in enumerate(as_completed(futures), start=1):
+                batch, error, elapsed, missing = future.result()
+                batch_indices = sorted([idx for idx, _ in batch] + attached.get(futures[future], []))
+                done += len(batch_indices)
+                failed += 1 if error else 0
+                untranslated += missing
+                if on_event:
+                    on_event({
+                        "type": "batch",
+                        "batch": futures[future],
+                        "indices": batch_indices,
+                        "failed": error is not None,
+                        "error": error,
+                        "elapsed": elapsed,
+                        "done": done,
+                        "total": total,
+                        "batches_done": batches_done,
+                        "batches_total": len(batches)
+                    })
+        result = {
+            "type": "done",
+            "routing": cascade.stats(),
+            "failed_batches": failed,
+            "untranslated": untranslated,
+            "elapsed": time.time() - job_start,
+            "memory": {
+                "exact": sum(1 for kind in served.values() if kind == "exact"),
+                "substituted": sum(1 for kind in served.values() if kind == "substituted"),
+                "hints": len(hints)
+            },
+            "quality": report.as_dict()
+        }
+        _log_quality(result["quality"])
+        if on_event:
+            on_event(result)
+        return result
+
+    def run_many(self, files, config, on_event=None):
+        """
+        Translate several files in place, packing their chunks into shared requests.
+
+        files is a list of (name, subs). Whole chunks of different files
+        fill each request up to config.max_chars, with cue ids qualified as
+        "file:cue" so answers are routed back to the right file. Meant for
+        many short files, where one request per file would be mostly
+        instruction overhead. Emits {"type": "request", "request": n,
+        "files": [names], "failed": bool, "error": str|None, "done": cues,
+        "total": cues, "requests_done": n, "requests_total": n} events and
+        returns {"type": "done", "requests": n, "failed_requests": n,
+        "routing": {...}, "elapsed": s, "quality": {...}}.
+        """
+        job_start = time.time()
+        cascade = self.cascade(config)
+        glossary, system_instruction = self.prepare(
+            cascade, config, [sub.text for _, subs in files for sub in subs]
+        )
+        memory = None
+        if config.memory_file:
+            memory = TranslationMemory(
+                config.memory_file, config.target_lang, config.censorship_level, config.style_notes
+            )
+        chunks = []  # (file_num, masked, hints, batch)
+        for file_num, (_, subs) in enumerate(files):
+            masked = [mask_markup(sub.text) for sub in subs]
+            served, hints = {}, {}
+            if memory:
+                served, hints = self.use_memory(memory, subs, masked, None, glossary)
+            masked, batches = self.plan(subs, config, skip=served, masked=masked)
+            chunks.extend((file_num, masked, hints, batch) for batch in batches)
+
+        # First fit in file order: each chunk joins the first request with room; none straddles two
+        requests = []
+        sizes = []
+        for chunk in chunks:
+            chunk_size = sum(len(text) for _, text in chunk[3])
+            for request_num, size in enumerate(sizes):
+                if size + chunk_size <= config.max_chars:
+                    requests[request_num].append(chunk)
+                    sizes[request_num] += chunk_size
+                    break
+            else:
+                requests.append([chunk])
+                sizes.append(chunk_size)
+        total = sum(len(chunk[3]) for chunk in chunks)
+        report = QualityReport()
+
+        with_context = self.uses_context(config)
+
+        def translate_request(request_num, request):
+            entries = []
+            hints = []
+            sources = {}
+            context = []
+            for file_num, masked, file_hints, batch in request:
+                entries.extend((f"{file_num}:{idx}", text) for idx, text in batch)
+                hints.extend(file_hints[idx] for idx, _ in batch if idx in file_hints)
+                sources.update((f"{file_num}:{idx}", masked[idx]) for idx, _ in batch)
+                if with_context:
+                    context.extend(context_lines(batch, [plain for plain, _ in masked], config.context_size))
+            try:
+                translated, suspect = self._translate_checked(
+                    cascade, config, system_instruction, entries, glossary, hints,
+                    f"Request {request_num + 1}: ", sources, report, context
+                )
+            except Exception as e:
+                logger.warning(f"Request {request_num + 1} translation failed: {e}")
+                return str(e)
+            masked_by_file = {file_num: masked for file_num, masked, _, _ in request}
+            learned = []
+            for entry_id, text in translated.items():
+                file_num, idx = (int(part) for part in entry_id.split(":"))
+                files[file_num][1][idx].text = unmask_markup(text, masked_by_file[file_num][idx][1])
+                if entry_id not in suspect:
+                    learned.append((masked_by_file[file_num][idx][0], text))
+            if memory:
+                try:
+                    memory.add(learned)
+                except Exception as e:
+                    logger.warning(f"[Memory] Could not store request {request_num + 1}: {e}")
+            return None
+
+        done = 0
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, config.max_workers)) as executor:
+            futures = {executor.submit(translate_request, n, request): n for n, request in enumerate(requests)}
+            for requests_done, future in enumerate(as_completed(futures), start=1):
+                error = future.result()
+                request = requests[futures[future]]
+                done += sum(len(chunk[3]) for chunk in request)
+                failed += 1 if error else 0
+                if on_event:
+                    on_event({
+                        "type": "request",
+                        "request": futures[future],
+                        "files": sorted({files[chunk[0]][0] for chunk in request}),
+                        "failed": error is not None,
+                        "error": error,
+                        "done": done,
+                        "total": total,
+                        "requests_done": requests_done,
+                        "requests_total": len(requests)
+                    })
+        result = {
+            "type": "done",
+            "requests": len(requests),
+            "failed_requests": failed,
+            "routing": cascade.stats(),
+            "elapsed": time.time() - job_start,
+            "quality": report.as_dict()
+        }
+        _log_quality(result["quality"])
+        if on_event:
+            on_event(result)
+        return result
+
+    async def stream(self, subs, config, indices=None):
+        """
+        Async iterator over the events of run(), which executes in a worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        finished = object()
+
+        def emit(event):
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+        def work():
+            try:
+                self.run(subs, config, indices=indices, on_event=emit)
+            except Exception as e:
+                emit({"type": "error", "error": str(e)})
+            finally:
+                emit(finished)
+
+        threading.Thread(target=work, daemon=True).start()
+        while True:
+            event = await queue.get()
+            if event is finished:
+                return
+            yield event
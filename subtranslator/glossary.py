@@ -0,0 +1,108 @@
+import re
+import logging
+import threading
+from collections import Counter
+from subtranslator.config_manager import load_state_file, save_state_file
+from subtranslator.prompts import build_glossary_instruction, build_chunk_prompt
+
+# Runs of capitalized words, e.g. "John", "New York", "O'Neil"; "I'm", "I'll" and other
+# single-letter contractions are not words here
+_WORD = r"[A-Z](?!['’][a-z])[\w'\-]*[a-z][\w'\-]*"
+_NAME_RE = re.compile(_WORD + r"(?:\s+" + _WORD + r")*")
+_TAG_RE = re.compile(r"<[^>]*>|\{[^}]*\}")
+_SENTENCE_END = (".", "!", "?", "-", "♪", '"', ":", "…")
+
+_file_lock = threading.Lock()
+logger = logging.getLogger(__name__)
+
+def extract_terms(texts, min_count=2, max_terms=300):
+    """
+    Return recurring proper nouns and terms from source texts, most frequent first.
+
+    A term is a run of capitalized words seen at least min_count times and
+    at least once mid-sentence, so ordinary sentence-initial words are
+    skipped. The first word of a sentence-initial run is dropped only if it
+    is never capitalized mid-sentence, so "Hey John" gives "John" but
+    "New York" stays whole. Only works for scripts with letter case.
+    """
+    found = []  # (term, starts_sentence)
+    for text in texts:
+        text = _TAG_RE.sub("", text)
+        for line in text.splitlines():
+            for match in _NAME_RE.finditer(line):
+                before = line[:match.start()].rstrip()
+                found.append((match.group(0), not before or before.endswith(_SENTENCE_END)))
+    mid_words = {word for term, initial in found if not initial for word in term.split()}
+
+    counts = Counter()
+    mid_sentence = set()
+    for term, initial in found:
+        if initial:
+            words = term.split(None, 1)
+            if words[0] not in mid_words:
+                if len(words) == 1:
+                    counts[term] += 1
+                    continue
+                term = words[1]
+        counts[term] += 1
+        mid_sentence.add(term)
+    terms = [t for t, n in counts.most_common() if n >= min_count and t in mid_sentence]
+    return terms[:max_terms]
+
+def terms_in(glossary, texts):
+    """
+    Return the part of glossary whose source terms occur in texts.
+    """
+    if not glossary:
+        return {}
+    joined = "\n".join(texts)
+    return {
+        source: target for source, target in glossary.items()
+        if re.search(r"(?<!\w)" + re.escape(source) + r"(?!\w)", joined)
+    }
+
+def translate_terms(api_manager, cascade, terms, target_lang):
+    """
+    Translate terms in one request; returns {term: translation}.
+    """
+    if not terms:
+        return {}
+    translated = cascade.translate(
+        api_manager, build_chunk_prompt(list(enumerate(terms))), range(len(terms)),
+        label="Glossary: ", system_instruction=build_glossary_instruction(target_lang)
+    )
+    return {terms[idx]: text for idx, text in translated.items() if text}
+
+class Glossary:
+    """
+    Term table shared by the jobs of a series, stored as {target_lang: {term: translation}}.
+
+    prepare() extracts the recurring terms of a file, translates only the
+    ones not seen in earlier episodes and saves them back to path.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.terms = load_state_file(path) if path else {}
+
+    def prepare(self, api_manager, cascade, texts, target_lang):
+        with _file_lock:
+            if self.path:
+                self.terms = load_state_file(self.path)
+            known = self.terms.get(target_lang, {})
+        missing = [t for t in extract_terms(texts) if t not in known]
+        if missing:
+            logger.info(f"[Glossary] Translating {len(missing)} new terms")
+            try:
+                new_terms = translate_terms(api_manager, cascade, missing, target_lang)
+            except Exception as e:
+                logger.warning(f"[Glossary] Term translation failed, continuing without: {e}")
+                new_terms = {}
+            with _file_lock:
+                # Merge with whatever other jobs saved meanwhile
+                if self.path:
+                    self.terms = load_state_file(self.path)
+                self.terms.setdefault(target_lang, {}).update(new_terms)
+                if self.path:
+                    save_state_file(self.path, self.terms)
+        return dict(self.terms.get(target_lang, {}))
@@ -0,0 +1,137 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class LatencyTracker:
+    """
+    Rolling window of recent request latencies.
+    """
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[rank]
+
+def _response_ok(response):
+    try:
+        return bool(response.text and response.text.strip())
+    except Exception:
+        # Blocked or empty candidates raise on .text
+        return False
+
+class HedgedCaller:
+    """
+    Wrap an APIKeyManager so slow requests get a backup copy.
+
+    When a request has been running longer than the given percentile of recent
+    latencies, an identical request is sent (call_gemini_api rotates to the
+    next key) and whichever returns a valid response first wins. The loser is
+    cancelled if it has not started yet, otherwise abandoned and its result
+    discarded. Hedges are capped at budget * requests so quota use stays bounded.
+
+    Exposes call_gemini_api() with the same signature and forwards everything
+    else to the wrapped manager, so it can be passed wherever one is expected.
+    concurrency is how many calls the caller makes at once; the pool holds a
+    primary and a hedge for each, so neither ever queues behind the other.
+    """
+
+    def __init__(self, api_manager, percentile=95, budget=0.1, min_samples=10, min_delay=2.0, concurrency=8):
+        self.api_manager = api_manager
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyTracker()
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2 * max(1, concurrency))
+
+    def __getattr__(self, name):
+        return getattr(self.api_manager, name)
+
+    def hedge_delay(self):
+        """
+        Seconds to wait before hedging, or None while there is too little history.
+        """
+        if len(self.latency) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _may_hedge(self):
+        with self._lock:
+            if len(self.api_manager.api_keys) < 2:
+                return False
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _timed_call(self, kwargs):
+        start = time.time()
+        response = self.api_manager.call_gemini_api(**kwargs)
+        self.latency.add(time.time() - start)
+        return response
+
+    def call_gemini_api(self, model_name, prompt, **kwargs):
+        kwargs.update(model_name=model_name, prompt=prompt)
+        with self._lock:
+            self.requests += 1
+        delay = self.hedge_delay()
+        if delay is None:
+            return self._timed_call(kwargs)
+
+        primary = self._executor.submit(self._timed_call, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._may_hedge():
+            return primary.result()
+
+        hedge = self._executor.submit(self._timed_call, kwargs)
+        pending = {primary, hedge}
+        fallback = None
+        last_error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if not _response_ok(response):
+                    fallback = response
+                    continue
+                for other in pending:
+                    other.cancel()
+                if future is hedge:
+                    with self._lock:
+                        self.hedge_wins += 1
+                return response
+        if fallback is not None:
+            return fallback
+        raise last_error
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50": self.latency.percentile(50),
+            "p95": self.latency.percentile(95)
+        }
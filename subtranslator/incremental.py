@@ -0,0 +1,56 @@
+import difflib
+import hashlib
+from subtranslator.translator import translate_subtitles
+
+def cue_key(text):
+    """
+    Hash a cue's text, ignoring whitespace differences but not markup.
+    """
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+def align_revision(new_subs, old_source, old_translation):
+    """
+    Map cues of a revised file to cues of a previously translated version.
+
+    Cues are compared by text hash only, so timing shifts (e.g. a frame rate
+    conversion) do not matter. Unchanged runs are aligned with
+    SequenceMatcher; remaining cues whose text appears anywhere in the old
+    file (moved or repeated lines) are matched to its first occurrence.
+    Returns {new_index: old_index}.
+    """
+    if len(old_source) != len(old_translation):
+        raise ValueError(
+            f"Previous source has {len(old_source)} cues but its translation has {len(old_translation)}."
+        )
+    old_keys = [cue_key(sub.text) for sub in old_source]
+    new_keys = [cue_key(sub.text) for sub in new_subs]
+
+    matches = {}
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for old_start, new_start, size in matcher.get_matching_blocks():
+        for offset in range(size):
+            matches[new_start + offset] = old_start + offset
+
+    first_seen = {}
+    for old_idx, key in enumerate(old_keys):
+        first_seen.setdefault(key, old_idx)
+    for new_idx, key in enumerate(new_keys):
+        if new_idx not in matches and key in first_seen:
+            matches[new_idx] = first_seen[key]
+    return matches
+
+def translate_revision(new_subs, old_source, old_translation, target_lang, api_manager, model_name, **kwargs):
+    """
+    Translate a revised file, reusing the previous translation for unchanged text.
+
+    Only new or edited cues are sent to the model, with their neighbours as
+    context. new_subs is updated in place; returns (reused, translated) counts.
+    """
+    matches = align_revision(new_subs, old_source, old_translation)
+    changed = [idx for idx in range(len(new_subs)) if idx not in matches]
+    # Translate first so the context around changed cues is still source text
+    if changed:
+        translate_subtitles(new_subs, target_lang, api_manager, model_name, indices=changed, **kwargs)
+    for new_idx, old_idx in matches.items():
+        new_subs[new_idx].text = old_translation[old_idx].text
+    return len(matches), len(changed)
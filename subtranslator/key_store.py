@@ -0,0 +1,175 @@
+import os
+import time
+import socket
+import sqlite3
+import threading
+import datetime
+from subtranslator.config_manager import KEY_STATE_DB, ensure_config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS key_state (
+    key TEXT PRIMARY KEY,
+    success INTEGER NOT NULL DEFAULT 0,
+    fail INTEGER NOT NULL DEFAULT 0,
+    last_used TEXT,
+    cooldown_until REAL,
+    next_free_at REAL NOT NULL DEFAULT 0,
+    last_leased_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_key ON leases (key);
+"""
+
+class SQLiteKeyStore:
+    """
+    Key usage state shared by every process pointing at the same database file.
+
+    Keys are handed out as short leases inside IMMEDIATE transactions, so
+    concurrent workers spread over the pool instead of all starting at index 0,
+    and counters/cooldowns are updated in place rather than last-writer-wins.
+    Leases expire on their own, so a crashed worker never pins a key.
+    """
+
+    def __init__(self, path=KEY_STATE_DB, lease_seconds=120, min_interval=0.0):
+        if path == KEY_STATE_DB:
+            ensure_config()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.min_interval = min_interval  # Minimum seconds between requests on one key
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _connect(self):
+        return Transaction(self._conn())
+
+    def sync_keys(self, keys):
+        with self._connect() as conn:
+            conn.executemany("INSERT OR IGNORE INTO key_state (key) VALUES (?)", [(k,) for k in keys])
+
+    def forget_key(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM key_state WHERE key = ?", (key,))
+            conn.execute("DELETE FROM leases WHERE key = ?", (key,))
+
+    def _try_lease(self, keys):
+        """
+        Return (key, None) on success or (None, seconds_to_wait).
+        """
+        now = time.time()
+        placeholders = ",".join("?" * len(keys))
+        with self._connect() as conn:
+            conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            rows = conn.execute(
+                f"""
+                SELECT s.key, s.cooldown_until, s.next_free_at,
+                       (SELECT COUNT(*) FROM leases l WHERE l.key = s.key) AS in_flight
+                FROM key_state s WHERE s.key IN ({placeholders})
+                ORDER BY in_flight ASC, s.last_leased_at ASC
+                """,
+                keys
+            ).fetchall()
+            waits = []
+            for row in rows:
+                if row["cooldown_until"] and row["cooldown_until"] > now:
+                    continue
+                if row["next_free_at"] > now:
+                    waits.append(row["next_free_at"] - now)
+                    continue
+                conn.execute(
+                    "UPDATE key_state SET last_leased_at = ?, next_free_at = ? WHERE key = ?",
+                    (now, now + self.min_interval, row["key"])
+                )
+                conn.execute(
+                    "INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                    (row["key"], self.owner, now + self.lease_seconds)
+                )
+                return row["key"], None
+        if not waits:
+            raise RuntimeError("All API keys are in cooldown.")
+        return None, min(waits)
+
+    def lease(self, keys):
+        """
+        Lease the least busy key, waiting out per-key pacing if necessary.
+        """
+        if not keys:
+            raise RuntimeError("No API keys configured.")
+        while True:
+            key, wait = self._try_lease(list(keys))
+            if key:
+                return key
+            time.sleep(wait)
+
+    def release(self, key, success, error_type=None, cooldown_seconds=3600):
+        now = datetime.datetime.utcnow()
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM leases WHERE id = (SELECT id FROM leases WHERE key = ? AND owner = ? ORDER BY id LIMIT 1)",
+                (key, self.owner)
+            )
+            if success:
+                conn.execute(
+                    "UPDATE key_state SET success = success + 1, last_used = ?, cooldown_until = NULL WHERE key = ?",
+                    (now.isoformat(), key)
+                )
+            else:
+                cooldown = time.time() + cooldown_seconds if error_type in ("quota", "auth") else None
+                conn.execute(
+                    "UPDATE key_state SET fail = fail + 1, last_used = ?, cooldown_until = COALESCE(?, cooldown_until) WHERE key = ?",
+                    (now.isoformat(), cooldown, key)
+                )
+
+    def foreign_leases(self, exclude_suffix=None):
+        """
+        Return how many unexpired leases other owners hold.
+
+        Owners whose name ends in exclude_suffix are not counted.
+        """
+        rows = self._conn().execute(
+            "SELECT owner FROM leases WHERE expires_at >= ? AND owner != ?", (time.time(), self.owner)
+        ).fetchall()
+        return sum(1 for row in rows if not (exclude_suffix and row["owner"].endswith(exclude_suffix)))
+
+    def get_meta(self):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT key, success, fail, last_used, cooldown_until FROM key_state"
+            ).fetchall()
+        return {row["key"]: dict(row) for row in rows}
+
+class Transaction:
+    """
+    Run a block inside BEGIN IMMEDIATE so readers and writers across
+    processes serialize on the database's write lock.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
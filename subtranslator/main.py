@@ -1,18 +1,194 @@
+import os
+import atexit
 import argparse
 from subtranslator.tui import launch_tui
+from subtranslator.config_manager import KEY_STATE_DB, BULK_DIR
+from subtranslator.api_manager import APIKeyManager
+from subtranslator.providers import GeminiProvider
+from subtranslator.concurrency import AdaptiveLimiter
+from subtranslator.translator import load_subtitles, translate_file, translate_files
+from subtranslator.engine import JobConfig
+from subtranslator.utils import setup_logging
 
 def main():
     parser = argparse.ArgumentParser(description="SubTranslator - AI-powered subtitle localization tool")
-    parser.add_argument('--input', type=str, help='Input .srt subtitle file')
+    parser.add_argument('--input', type=str, nargs='+',
+                        help='Input .srt subtitle file; several files are packed into shared requests')
     parser.add_argument('--target-lang', type=str, help='Target language ISO 639-1 code')
     parser.add_argument('--censorship', action='store_true', help='Enable NSFW censorship')
     parser.add_argument('--batch', action='store_true', help='Run in headless batch mode')
+    parser.add_argument('--model', type=str,
+                        help='Gemini model for headless modes; a comma-separated list escalates failed chunks to later models')
+    parser.add_argument('--cascade-timeout', type=float, metavar='SECONDS',
+                        help='Per-request timeout after which a chunk moves on to the next --model')
+    parser.add_argument('--watch', action='store_true', help='Watch input folders and translate new files')
+    parser.add_argument('--watch-dir', action='append', help='Folder to watch (repeatable, default: Input/)')
+    parser.add_argument('--output-dir', type=str, default='Output', help='Folder for translated files')
+    parser.add_argument('--workers', type=int, default=2, help='Number of files translated in parallel')
+    parser.add_argument('--chunk-workers', type=int,
+                        help='Number of chunks of one file translated in parallel (default 1, or --max-concurrency with --adaptive)')
+    parser.add_argument('--progressive', action='store_true', help='Grow the output file in order while translating')
+    parser.add_argument('--previous-source', type=str, help='Earlier version of --input that was already translated')
+    parser.add_argument('--previous-translation', type=str, help='Translation of --previous-source to reuse for unchanged cues')
+    parser.add_argument('--serve', action='store_true', help='Run the local HTTP job API')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host for --serve')
+    parser.add_argument('--port', type=int, default=8765, help='Port for --serve')
+    parser.add_argument('--input-root', type=str,
+                        help='Let --serve jobs name files inside this folder instead of uploading them')
+    parser.add_argument('--key-store', nargs='?', const=KEY_STATE_DB,
+                        help='Share key leases and cooldowns with other processes via this SQLite file')
+    parser.add_argument('--key-interval', type=float, default=0.0,
+                        help='Minimum seconds between requests on the same key (with --key-store)')
+    parser.add_argument('--context-cache', action='store_true',
+                        help='Upload job instructions once as Gemini cached content where supported')
+    parser.add_argument('--hedge', type=float, metavar='PCT',
+                        help='Send a backup request on another key once a request exceeds this latency percentile (e.g. 95)')
+    parser.add_argument('--hedge-budget', type=float, default=0.1,
+                        help='Maximum share of requests that may be hedged (default 0.1)')
+    parser.add_argument('--adaptive', action='store_true',
+                        help='Find the sustainable number of requests in flight automatically (AIMD)')
+    parser.add_argument('--max-concurrency', type=int, default=16,
+                        help='Upper bound for --adaptive; also the chunk pool size unless --chunk-workers is set')
+    parser.add_argument('--glossary', type=str, metavar='PATH',
+                        help='Extract and translate recurring names and terms once, kept in this JSON file across episodes')
+    parser.add_argument('--memory', type=str, metavar='PATH',
+                        help='Translation memory (SQLite) that reuses earlier translations of near-identical lines')
+    parser.add_argument('--bulk-submit', action='store_true',
+                        help='Queue all chunk requests for --input files as one offline batch job')
+    parser.add_argument('--bulk-process', action='store_true',
+                        help='Answer pending batch jobs with the local file-based batch runner')
+    parser.add_argument('--bulk-collect', type=str, metavar='JOB_ID',
+                        help='Merge a finished batch job into --output-dir')
+    parser.add_argument('--bulk-fix', action='store_true',
+                        help='With --bulk-collect, re-translate cues that fail quality checks interactively')
+    parser.add_argument('--bulk-dir', type=str, default=BULK_DIR, help='Folder for batch job files')
+    parser.add_argument('--record', type=str, metavar='PATH',
+                        help='Record every API request and response to this compressed cassette file')
+    parser.add_argument('--replay', type=str, metavar='PATH',
+                        help='Serve API responses from a recorded cassette instead of calling Gemini')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='Multiply recorded latencies by this factor on --replay (0 = no waiting)')
     args = parser.parse_args()
+    headless = args.bulk_submit or args.bulk_process or args.bulk_collect or args.serve or args.watch or args.batch
+    # The curses TUI owns the terminal, so its messages go to the log file
+    setup_logging(to_file=not headless)
 
-    if args.batch:
-        print("Batch mode not yet implemented.")
+    key_store = None
+    if args.key_store:
+        from subtranslator.key_store import SQLiteKeyStore
+        key_store = SQLiteKeyStore(args.key_store, min_interval=args.key_interval)
+    limiter = None
+    if args.adaptive:
+        limiter = AdaptiveLimiter(max_limit=args.max_concurrency)
+        if args.chunk_workers is None:
+            args.chunk_workers = args.max_concurrency
+    if args.chunk_workers is None:
+        args.chunk_workers = 1
+    if args.replay:
+        from subtranslator.cassette import ReplayProvider
+        provider = ReplayProvider(args.replay, time_scale=args.replay_speed)
     else:
-        launch_tui()
+        provider = GeminiProvider(use_context_cache=args.context_cache)
+    if args.record:
+        from subtranslator.cassette import RecordingProvider
+        provider = RecordingProvider(provider, args.record)
+        atexit.register(provider.close)
+    api_manager = APIKeyManager(key_store=key_store, provider=provider, limiter=limiter)
+    if args.hedge:
+        from subtranslator.hedging import HedgedCaller
+        # Watch and server modes run --workers files at once, each with --chunk-workers requests
+        api_manager = HedgedCaller(api_manager, percentile=args.hedge, budget=args.hedge_budget,
+                                   concurrency=args.chunk_workers * args.workers)
+
+    if args.bulk_submit or args.bulk_process or args.bulk_collect:
+        from subtranslator.bulk import LocalBatchProvider, submit_bulk, collect_bulk
+        batch_provider = LocalBatchProvider(args.bulk_dir, api_manager)
+        if args.bulk_submit:
+            if not args.input or not args.target_lang or not args.model:
+                parser.error('--bulk-submit requires --input, --target-lang and --model')
+            config = JobConfig(
+                args.target_lang, args.model, censorship_level="mask" if args.censorship else None,
+                glossary_file=args.glossary, memory_file=args.memory, cascade_timeout=args.cascade_timeout
+            )
+            job_id = submit_bulk(api_manager, batch_provider, args.input, config, directory=args.bulk_dir)
+            print(f"Batch job {job_id} submitted; collect it with --bulk-collect {job_id}")
+        if args.bulk_process:
+            batch_provider.process()
+        if args.bulk_collect:
+            collected = collect_bulk(
+                batch_provider, args.bulk_collect, args.output_dir, directory=args.bulk_dir,
+                api_manager=api_manager if args.bulk_fix else None
+            )
+            if collected is None:
+                print(f"Batch job {args.bulk_collect}: {batch_provider.status(args.bulk_collect)}")
+            else:
+                out_paths, report = collected
+                print(f"Saved {len(out_paths)} files to {args.output_dir}; "
+                      f"{len(report['remaining'])} of {report['checked']} cues still suspect")
+    elif args.serve:
+        from subtranslator.server import serve
+        serve(args.host, args.port, max_workers=args.workers, api_manager=api_manager,
+              chunk_workers=args.chunk_workers, glossary_file=args.glossary, memory_file=args.memory,
+              input_root=args.input_root, cascade_timeout=args.cascade_timeout)
+    elif args.watch:
+        if not args.target_lang or not args.model:
+            parser.error('--watch requires --target-lang and --model')
+        from subtranslator.watcher import FolderWatcher
+        watcher = FolderWatcher(
+            args.watch_dir or ['Input'],
+            args.output_dir,
+            args.target_lang,
+            args.model,
+            api_manager=api_manager,
+            censorship=args.censorship,
+            max_workers=args.workers,
+            chunk_workers=args.chunk_workers,
+            progressive=args.progressive,
+            glossary_file=args.glossary,
+            memory_file=args.memory,
+            cascade_timeout=args.cascade_timeout
+        )
+        watcher.run()
+    elif args.batch:
+        if not args.input or not args.target_lang or not args.model:
+            parser.error('--batch requires --input, --target-lang and --model')
+        if bool(args.previous_source) != bool(args.previous_translation):
+            parser.error('--previous-source and --previous-translation must be given together')
+        if len(args.input) > 1:
+            if args.previous_source or args.progressive:
+                parser.error('--previous-source and --progressive need a single --input')
+            out_paths, requests = translate_files(
+                args.input, args.target_lang, api_manager, args.model, args.output_dir,
+                censorship=args.censorship, max_workers=args.chunk_workers,
+                glossary_file=args.glossary, memory_file=args.memory, cascade_timeout=args.cascade_timeout
+            )
+            print(f"Saved {len(out_paths)} files to {args.output_dir} ({requests} requests)")
+            return
+        args.input = args.input[0]
+        if args.previous_source:
+            from subtranslator.incremental import translate_revision
+            subs = load_subtitles(args.input)
+            reused, translated = translate_revision(
+                subs, load_subtitles(args.previous_source), load_subtitles(args.previous_translation),
+                args.target_lang, api_manager, args.model,
+                censorship=args.censorship, max_workers=args.chunk_workers,
+                glossary_file=args.glossary, memory_file=args.memory, cascade_timeout=args.cascade_timeout
+            )
+            os.makedirs(args.output_dir, exist_ok=True)
+            base_name = os.path.splitext(os.path.basename(args.input))[0]
+            out_path = os.path.join(args.output_dir, f"{base_name}_translated.srt")
+            subs.save(out_path, encoding='utf-8')
+            print(f"Reused {reused} cues, translated {translated}.")
+        else:
+            out_path = translate_file(
+                args.input, args.target_lang, api_manager, args.model, args.output_dir,
+                censorship=args.censorship, max_workers=args.chunk_workers, progressive=args.progressive,
+                glossary_file=args.glossary, memory_file=args.memory, cascade_timeout=args.cascade_timeout
+            )
+        print(f"Saved {out_path}")
+    else:
+        launch_tui(api_manager, chunk_workers=args.chunk_workers, glossary_file=args.glossary,
+                   memory_file=args.memory, cascade_timeout=args.cascade_timeout)
 
 if __name__ == "__main__":
     main()
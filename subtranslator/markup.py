@@ -0,0 +1,122 @@
+import re
+
+# HTML-style tags (<i>, </b>, <font color="...">), ASS overrides ({\an8}), hard line breaks
+MARKUP_RE = re.compile(r'(</?[a-zA-Z][^<>]*>|\{\\[^{}]*\}|\\N|\r?\n)')
+PLACEHOLDER_RE = re.compile(r'(\s*)<(\d+)>(\s*)')
+TAG_NAME_RE = re.compile(r'<(/?)([a-zA-Z]+)')
+BREAKS = ("\n", "\r\n", "\\N")
+
+def mask_markup(text):
+    """
+    Strip markup from a cue before prompting.
+
+    Tags wrapping the whole cue move to a side table and never reach the
+    model; tags and line breaks inside the text become numbered placeholders
+    (<1>, <2>, ...). Returns (plain_text, table) for unmask_markup().
+    """
+    tokens = [t for t in MARKUP_RE.split(text) if t]
+    tags = []  # every markup token, by id
+    kinds = []  # tag id for markup tokens, None for text
+    for token in tokens:
+        if MARKUP_RE.fullmatch(token):
+            kinds.append(len(tags))
+            tags.append(token)
+        else:
+            kinds.append(None)
+
+    # Leading/trailing markup (and whitespace) is kept out of the prompt
+    start = 0
+    while start < len(tokens) and (kinds[start] is not None or not tokens[start].strip()):
+        start += 1
+    end = len(tokens)
+    while end > start and (kinds[end - 1] is not None or not tokens[end - 1].strip()):
+        end -= 1
+
+    prefix = [kinds[i] if kinds[i] is not None else tokens[i] for i in range(start)]
+    suffix = [kinds[i] if kinds[i] is not None else tokens[i] for i in range(end, len(tokens))]
+    body = ''
+    body_ids = []  # placeholder <n> stands for tags[body_ids[n - 1]]
+    for i in range(start, end):
+        if kinds[i] is None:
+            body += tokens[i]
+        else:
+            body_ids.append(kinds[i])
+            body += f"<{len(body_ids)}>"
+
+    table = {
+        "tags": tags,
+        "prefix": prefix,
+        "suffix": suffix,
+        "body_ids": body_ids,
+        "pairs": _pair_tags(tags)
+    }
+    return body, table
+
+def _pair_tags(tags):
+    """
+    Map each HTML open tag id to its closing tag id and back.
+    """
+    pairs = {}
+    stack = []
+    for tag_id, tag in enumerate(tags):
+        match = TAG_NAME_RE.match(tag)
+        if not match:
+            continue
+        closing, name = match.group(1), match.group(2).lower()
+        if not closing:
+            stack.append((name, tag_id))
+            continue
+        for pos in range(len(stack) - 1, -1, -1):
+            if stack[pos][0] == name:
+                open_id = stack.pop(pos)[1]
+                pairs[str(open_id)] = tag_id
+                pairs[str(tag_id)] = open_id
+                break
+    return pairs
+
+def placeholders_intact(translated, table):
+    """
+    True if every placeholder sent to the model came back exactly once.
+    """
+    found = [int(m.group(2)) for m in PLACEHOLDER_RE.finditer(translated)]
+    return sorted(found) == list(range(1, len(table["body_ids"]) + 1))
+
+def unmask_markup(translated, table):
+    """
+    Put markup stripped by mask_markup() back into the translated text.
+
+    Placeholders the model dropped are skipped, and so is the other half of
+    their tag pair, so a lost <1> never leaves a dangling </i> behind.
+    """
+    tags = table["tags"]
+    pairs = table["pairs"]
+    body_ids = table["body_ids"]
+
+    def tag_for(m):
+        n = int(m.group(2))
+        return body_ids[n - 1] if 1 <= n <= len(body_ids) else None
+
+    seen = {tag_for(m) for m in PLACEHOLDER_RE.finditer(translated)} - {None}
+    present = seen | {t for t in table["prefix"] + table["suffix"] if isinstance(t, int)}
+    keep = {t for t in present if str(t) not in pairs or pairs[str(t)] in present}
+
+    used = set()
+
+    def restore(m):
+        tag_id = tag_for(m)
+        if tag_id is None:
+            return m.group(0)
+        if tag_id in used or tag_id not in keep:
+            used.add(tag_id)
+            return m.group(1) or m.group(3)
+        used.add(tag_id)
+        if tags[tag_id] in BREAKS:
+            return tags[tag_id]
+        return m.group(1) + tags[tag_id] + m.group(3)
+
+    body = PLACEHOLDER_RE.sub(restore, translated.strip())
+
+    def render(parts):
+        return ''.join(tags[p] if isinstance(p, int) else p for p in parts if not isinstance(p, int) or p in keep)
+
+    return render(table["prefix"]) + body + render(table["suffix"])
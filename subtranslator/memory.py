@@ -0,0 +1,213 @@
+import os
+import re
+import json
+import zlib
+import hashlib
+import sqlite3
+import threading
+from subtranslator.key_store import Transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    lang TEXT NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    norm TEXT NOT NULL,
+    skeleton TEXT NOT NULL,
+    slots TEXT NOT NULL,
+    UNIQUE (lang, source)
+);
+CREATE INDEX IF NOT EXISTS entries_norm ON entries (lang, norm);
+CREATE INDEX IF NOT EXISTS entries_skeleton ON entries (lang, skeleton);
+CREATE TABLE IF NOT EXISTS bands (
+    lang TEXT NOT NULL,
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS bands_bucket ON bands (lang, band, bucket);
+"""
+
+_PUNCT_RE = re.compile(r"[^\w<>\s?!…]")
+_MARK_RE = re.compile(r"([?!…])\1*")
+_SLOT_RE = re.compile(r"(?<![\w<])(?:[A-Z][a-z][\w']*|\d+)(?![\w>])")
+
+# MinHash: 16 hash functions in 8 bands of 2 rows
+_PRIME = (1 << 31) - 1
+_HASHES = [((i * 2654435761) % _PRIME or 1, (i * 40503 + 12345) % _PRIME) for i in range(1, 17)]
+_ROWS = 2
+
+def normalize(text):
+    """
+    Lowercase and strip punctuation and speaker dashes; placeholders stay.
+
+    "?", "!" and ellipses are kept as tokens since they change what a line
+    means ("You're leaving?" is not "You're leaving.").
+    """
+    text = _PUNCT_RE.sub(" ", text.lower().replace("...", "…"))
+    return " ".join(_MARK_RE.sub(r" \1 ", text).split())
+
+def skeleton(text):
+    """
+    Return (key, slots): the normalized text with names and numbers replaced by #.
+
+    Names are capitalized words that do not start a sentence.
+    """
+    slots = []
+    for match in _SLOT_RE.finditer(text):
+        before = text[:match.start()].rstrip(" \"'")
+        if match.group(0)[0].isdigit() or (before and not before.endswith((".", "!", "?", "-", "…"))):
+            slots.append(match.group(0))
+    lowered = {s.lower() for s in slots}
+    key = " ".join("#" if token in lowered else token for token in normalize(text).split())
+    return key, slots
+
+def _shingles(norm):
+    padded = f" {norm} "
+    return {padded[i:i + 3] for i in range(max(1, len(padded) - 2))}
+
+def _minhash(shingles):
+    hashed = [zlib.crc32(s.encode("utf-8")) for s in shingles]
+    return [min((a * h + b) % _PRIME for h in hashed) for a, b in _HASHES]
+
+def _bands(norm):
+    signature = _minhash(_shingles(norm))
+    return [
+        (band, zlib.crc32(repr(signature[band * _ROWS:(band + 1) * _ROWS]).encode("ascii")))
+        for band in range(len(signature) // _ROWS)
+    ]
+
+def _substitute(target, old_slots, new_slots, glossary=None):
+    """
+    Swap names and numbers of a stored translation; None if one cannot be found.
+    """
+    glossary = glossary or {}
+    for old, new in zip(old_slots, new_slots):
+        if old == new:
+            continue
+        old_t, new_t = glossary.get(old, old), glossary.get(new, new)
+        pattern = r"(?<!\w)" + re.escape(old_t) + r"(?!\w)"
+        if len(re.findall(pattern, target)) != 1:
+            return None
+        target = re.sub(pattern, lambda m: new_t, target)
+    return target
+
+def memory_key(target_lang, censorship_level=None, style_notes=None):
+    """
+    Return the key that separates memory entries of jobs whose translations differ.
+
+    Lines translated at one censorship level or with one set of style notes
+    are not reused for another. Plain jobs keep the bare language, so
+    memories written before censorship and style were part of the key still
+    serve them.
+    """
+    key = target_lang
+    if censorship_level:
+        key += f"|censor={censorship_level}"
+    if style_notes:
+        key += "|style=" + hashlib.sha1(style_notes.encode("utf-8")).hexdigest()[:12]
+    return key
+
+class TranslationMemory:
+    """
+    Near-duplicate index over earlier translations, kept in a SQLite file per series.
+
+    lookup() tries, in order: the same line after normalizing case,
+    punctuation other than "?", "!" and ellipses, and speaker dashes; the same line with other
+    names or numbers, reused by substituting them in the stored
+    translation; and a MinHash match on character trigrams whose Jaccard
+    similarity reaches hint_threshold, returned as a hint for the model.
+    Every step is an indexed query, so lookups stay fast on large files.
+    Entries are kept apart by target language, censorship level and style
+    notes (see memory_key).
+    """
+
+    def __init__(self, path, target_lang, censorship_level=None, style_notes=None,
+                 hint_threshold=0.5, max_candidates=50):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lang = memory_key(target_lang, censorship_level, style_notes)
+        self.hint_threshold = hint_threshold
+        self.max_candidates = max_candidates
+        self._local = threading.local()
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def add(self, pairs):
+        """
+        Store (source, target) pairs of masked cue text; known sources are kept as they are.
+        """
+        with Transaction(self._conn()) as conn:
+            for source, target in pairs:
+                if not source.strip() or not target.strip():
+                    continue
+                norm = normalize(source)
+                key, slots = skeleton(source)
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO entries (lang, source, target, norm, skeleton, slots) VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.lang, source, target, norm, key, json.dumps(slots))
+                )
+                if cur.rowcount == 1:
+                    conn.executemany(
+                        "INSERT INTO bands (lang, band, bucket, entry_id) VALUES (?, ?, ?, ?)",
+                        [(self.lang, band, bucket, cur.lastrowid) for band, bucket in _bands(norm)]
+                    )
+
+    def lookup(self, text, glossary=None):
+        """
+        Return ("exact", target), ("substituted", target), ("hint", (source, target)) or (None, None).
+        """
+        conn = self._conn()
+        norm = normalize(text)
+        if not norm:
+            return None, None
+        row = conn.execute(
+            "SELECT target FROM entries WHERE lang = ? AND norm = ? LIMIT 1", (self.lang, norm)
+        ).fetchone()
+        if row:
+            return "exact", row[0]
+
+        key, slots = skeleton(text)
+        if slots:
+            rows = conn.execute(
+                "SELECT target, slots FROM entries WHERE lang = ? AND skeleton = ? LIMIT 5", (self.lang, key)
+            ).fetchall()
+            for target, old_slots in rows:
+                old_slots = json.loads(old_slots)
+                if len(old_slots) == len(slots):
+                    substituted = _substitute(target, old_slots, slots, glossary)
+                    if substituted is not None:
+                        return "substituted", substituted
+
+        # Each band lookup is capped, so crowded buckets cannot slow a lookup down
+        candidates = set()
+        per_band = max(1, self.max_candidates // 4)
+        for band, bucket in _bands(norm):
+            candidates.update(row[0] for row in conn.execute(
+                "SELECT entry_id FROM bands WHERE lang = ? AND band = ? AND bucket = ? LIMIT ?",
+                (self.lang, band, bucket, per_band)
+            ))
+        if not candidates:
+            return None, None
+        ids = list(candidates)[:self.max_candidates]
+        rows = conn.execute(
+            f"SELECT source, target, norm FROM entries WHERE id IN ({','.join('?' * len(ids))})", ids
+        ).fetchall()
+        shingles = _shingles(norm)
+        best, best_score = None, self.hint_threshold
+        for source, target, other in rows:
+            other_shingles = _shingles(other)
+            score = len(shingles & other_shingles) / len(shingles | other_shingles)
+            if score >= best_score:
+                best, best_score = (source, target), score
+        if best:
+            return "hint", best
+        return None, None
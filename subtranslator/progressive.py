@@ -0,0 +1,51 @@
+import os
+import tempfile
+import threading
+
+class ProgressiveSRTWriter:
+    """
+    Grow an output .srt as chunks finish, always leaving a valid file on disk.
+
+    Chunks are numbered from 0 in timeline order. A chunk that finishes early
+    waits in a reorder buffer until every chunk before it is written, so the
+    file is always a correctly numbered prefix of the final translation. Each
+    flush rewrites the file through a temp file and os.replace, so readers
+    never see a half-written cue.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.next_chunk = 0
+        self.cue_count = 0
+        self._pending = {}  # chunk number: list of cues
+        self._blocks = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._flush()
+
+    def add(self, chunk_num, cues):
+        with self._lock:
+            self._pending[chunk_num] = cues
+            if self.next_chunk not in self._pending:
+                return False
+            while self.next_chunk in self._pending:
+                for cue in self._pending.pop(self.next_chunk):
+                    self.cue_count += 1
+                    self._blocks.append(f"{self.cue_count}\n{cue.start} --> {cue.end}\n{cue.text}\n\n")
+                self.next_chunk += 1
+            self._flush()
+            return True
+
+    def _flush(self):
+        dir_name = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=dir_name, suffix=".srt.tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write("".join(self._blocks))
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except Exception:
+                pass
+            raise
@@ -0,0 +1,104 @@
+import re
+
+QUALIFIED_ID_RE = re.compile(r"\d+:\d+")  # "file:cue" ids of packed multi-file requests
+
+# Fixed per-job instructions, sent once as a system instruction rather than per chunk.
+
+CENSORSHIP_RULES = {
+    None: (
+        "- Provide ONLY ONE natural, idiomatic translation per line.\n"
+        "- Do NOT include explanations, alternatives, or comments.\n"
+        "- If unsure, pick the most neutral, natural-sounding translation.\n"
+    ),
+    "low": (
+        "- Replace only highly offensive or explicit terms with polite equivalents.\n"
+        "- Preserve humor, tone, and mild slang.\n"
+        "- Do NOT include explanations or alternatives.\n"
+    ),
+    "medium": (
+        "- Replace explicit, offensive, or suggestive language with polite or neutral terms.\n"
+        "- Maintain overall tone but avoid inappropriate content.\n"
+        "- Do NOT include explanations or alternatives.\n"
+    ),
+    "high": (
+        "- Aggressively censor all NSFW, offensive, or suggestive language.\n"
+        "- Replace with family-friendly, polite expressions.\n"
+        "- Maintain timing and formatting.\n"
+        "- Do NOT include explanations or alternatives.\n"
+    ),
+    "mask": (
+        "- Preserve meaning and adapt idioms naturally.\n"
+        "- Censor any NSFW or offensive content by replacing it with '####'.\n"
+    ),
+}
+
+def build_system_instruction(target_lang, censorship_level=None, glossary=None, style_notes=None, chunk_glossary=False):
+    """
+    Build the instruction block shared by every chunk of a job.
+
+    censorship_level is None (uncensored), 'low', 'medium', 'high' or 'mask'.
+    glossary maps source terms to fixed translations. With chunk_glossary
+    the terms are sent per chunk instead (see build_chunk_prompt) and only
+    the rule to follow them is added here.
+    """
+    instruction = (
+        f"Translate the subtitles you are given into {target_lang}.\n\n"
+        + CENSORSHIP_RULES[censorship_level]
+        + "- Keep the numbering format: [number] translated text.\n"
+        "- Keep placeholders like <1> in place; they mark formatting and line breaks.\n"
+        "- Do not output anything else.\n"
+    )
+    if chunk_glossary:
+        instruction += "- Translate terms listed under Glossary exactly as given there.\n"
+    if style_notes:
+        instruction += f"\nStyle notes:\n{style_notes.strip()}\n"
+    if glossary:
+        instruction += "\nAlways translate these terms as given:\n"
+        for source, target in glossary.items():
+            instruction += f"{source} = {target}\n"
+    return instruction
+
+def build_glossary_instruction(target_lang):
+    """
+    Build the instruction for the one-time term translation pass of a job.
+    """
+    return (
+        f"Each line is a name or recurring term from a subtitle file. Give the form it should take in {target_lang} subtitles.\n"
+        "- Keep personal names unchanged unless there is an established form in the target language.\n"
+        "- Keep the numbering format: [number] translated term.\n"
+        "- Do not output anything else.\n"
+    )
+
+def build_chunk_prompt(entries, glossary=None, hints=None, context=None):
+    """
+    Build the per-chunk payload from (id, text) pairs, led by a compact
+    table of the glossary terms it uses, earlier translations of similar
+    lines (hints maps source to translation) and unnumbered context lines
+    that are not to be translated.
+    """
+    prompt = ""
+    if glossary:
+        prompt += "Glossary:\n" + "".join(f"{source} = {target}\n" for source, target in glossary.items()) + "\n"
+    if hints:
+        prompt += "Similar lines translated before (for reference only):\n"
+        prompt += "".join(f"{source} => {target}\n" for source, target in hints.items()) + "\n"
+    if context:
+        prompt += "Earlier lines (context only, do not translate):\n"
+        prompt += "".join(f"- {text}\n" for text in context) + "\n"
+    return prompt + "".join(f"[{entry_id}] {text}\n" for entry_id, text in entries)
+
+def parse_response(text):
+    """
+    Parse "[id] translated text" lines into {id: text}; other lines are ignored.
+
+    Plain ids become ints; file-qualified ids ("2:14") are kept as strings.
+    """
+    parsed = {}
+    for line in text.splitlines():
+        if line.strip().startswith("[") and "]" in line:
+            idx_str = line.strip().split("]")[0][1:].strip()
+            if idx_str.isdigit():
+                parsed[int(idx_str)] = line.split("]", 1)[1].strip()
+            elif QUALIFIED_ID_RE.fullmatch(idx_str):
+                parsed[idx_str] = line.split("]", 1)[1].strip()
+    return parsed
@@ -0,0 +1,146 @@
+import re
+import time
+import logging
+import datetime
+import threading
+import google.generativeai as genai
+from google.generativeai import caching as genai_caching
+from google.generativeai import client as genai_client
+
+logger = logging.getLogger(__name__)
+
+class ProviderResponse:
+    """
+    Minimal response object for providers that do not return Gemini responses.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+class GeminiProvider:
+    """
+    Google Gemini via google-generativeai.
+
+    Keeps one warm GenerativeModel per (key, model, system instruction). With
+    use_context_cache the instruction is uploaded once per key as cached
+    content; models or instructions too small to cache fall back to a plain
+    system instruction, and models without system instruction support fall
+    back to prepending it to the prompt. Cached models are recreated
+    shortly before their cache expires, or at once if the service reports
+    the cache missing.
+    """
+    supports_system_instruction = True
+    needs_keys = True
+
+    def __init__(self, use_context_cache=False, cache_ttl=3600):
+        self.use_context_cache = use_context_cache
+        self.cache_ttl = cache_ttl
+        self._lock = threading.RLock()
+        self._models = {}  # (key, model_name, system_instruction): (GenerativeModel, expires_at or None)
+        self._no_cache = set()  # (model_name, system_instruction) that could not be cached
+        self._inline_only = set()  # model names that reject system instructions
+
+    def _cached_model(self, model_name, system_instruction):
+        """
+        Return (model, expires_at) backed by a new context cache, or None.
+        """
+        if (model_name, system_instruction) in self._no_cache:
+            return None
+        try:
+            cached = genai_caching.CachedContent.create(
+                model=model_name,
+                system_instruction=system_instruction,
+                ttl=datetime.timedelta(seconds=self.cache_ttl)
+            )
+            # Renew a minute (or a tenth of the TTL) early so no request races the expiry
+            expires_at = time.time() + self.cache_ttl - min(60, self.cache_ttl / 10)
+            return genai.GenerativeModel.from_cached_content(cached), expires_at
+        except Exception as e:
+            logger.warning(f"[API] Context cache unavailable for {model_name}, using system instruction: {e}")
+            self._no_cache.add((model_name, system_instruction))
+            return None
+
+    def get_model(self, key, model_name, system_instruction=None):
+        """
+        Return a GenerativeModel bound to the given key, reusing it across calls.
+
+        genai.configure() is process-global, so the client is resolved under the
+        lock and pinned on the model before another thread can reconfigure.
+        """
+        with self._lock:
+            model, expires_at = self._models.get((key, model_name, system_instruction), (None, None))
+            if model is not None and expires_at is not None and time.time() >= expires_at:
+                model = None
+            if model is None:
+                genai.configure(api_key=key)
+                cached = None
+                if system_instruction and self.use_context_cache:
+                    cached = self._cached_model(model_name, system_instruction)
+                if cached:
+                    model, expires_at = cached
+                else:
+                    model, expires_at = genai.GenerativeModel(model_name, system_instruction=system_instruction), None
+                model._client = genai_client.get_default_generative_client()
+                self._models[(key, model_name, system_instruction)] = (model, expires_at)
+            return model
+
+    def _evict(self, key, model_name, system_instruction):
+        with self._lock:
+            self._models.pop((key, model_name, system_instruction), None)
+
+    def forget_key(self, key):
+        with self._lock:
+            for cache_key in [c for c in self._models if c[0] == key]:
+                del self._models[cache_key]
+
+    def generate(self, key, model_name, prompt, safety_settings=None, system_instruction=None, timeout=None):
+        if system_instruction and model_name in self._inline_only:
+            prompt = system_instruction + "\n\n" + prompt
+            system_instruction = None
+        model = self.get_model(key, model_name, system_instruction)
+        request_options = {"timeout": timeout} if timeout else None
+        try:
+            return model.generate_content(
+                prompt, safety_settings=safety_settings or [], request_options=request_options
+            )
+        except Exception as e:
+            message = str(e).lower()
+            if "cache" in message and ("not found" in message or "expired" in message):
+                # Deleted or expired on the server side: build a fresh cache once
+                logger.info(f"[API] Context cache for {model_name} is gone, recreating it")
+                self._evict(key, model_name, system_instruction)
+                model = self.get_model(key, model_name, system_instruction)
+                return model.generate_content(
+                    prompt, safety_settings=safety_settings or [], request_options=request_options
+                )
+            if system_instruction and "instruction" in message:
+                # e.g. Gemma models: resend with the instruction inline from now on
+                self._inline_only.add(model_name)
+                return self.generate(key, model_name, prompt, safety_settings, system_instruction, timeout)
+            raise
+
+class EchoProvider:
+    """
+    Offline stand-in that needs no network or keys.
+
+    Answers every "[n] text" line with the text unchanged and tallies what a
+    real provider would have been sent, so prompt size can be measured locally.
+    """
+    supports_system_instruction = True
+    needs_keys = False
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_chars = 0
+        self.instructions = set()
+
+    def forget_key(self, key):
+        pass
+
+    def generate(self, key, model_name, prompt, safety_settings=None, system_instruction=None, timeout=None):
+        self.calls += 1
+        self.prompt_chars += len(prompt)
+        if system_instruction:
+            self.instructions.add(system_instruction)
+        lines = [line for line in prompt.splitlines() if re.match(r"\s*\[[^\]]+\]", line)]
+        return ProviderResponse("\n".join(lines))
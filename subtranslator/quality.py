@@ -0,0 +1,147 @@
+import re
+import threading
+import unicodedata
+from subtranslator.markup import placeholders_intact
+
+# Scripts expected for common target languages, keyed by ISO 639-1 code and English name
+_SCRIPTS = {
+    "LATIN": (
+        "en", "fr", "de", "es", "it", "pt", "nl", "sv", "no", "nb", "da", "fi", "pl", "cs", "sk", "hu",
+        "ro", "tr", "id", "ms", "vi", "hr", "sl", "et", "lv", "lt", "ca", "ga", "tl",
+        "english", "french", "german", "spanish", "italian", "portuguese", "dutch", "swedish",
+        "norwegian", "danish", "finnish", "polish", "czech", "slovak", "hungarian", "romanian",
+        "turkish", "indonesian", "malay", "vietnamese", "croatian", "slovenian", "catalan",
+        "brazilian portuguese"
+    ),
+    "CYRILLIC": ("ru", "uk", "bg", "sr", "be", "mk", "kk", "russian", "ukrainian", "bulgarian", "serbian"),
+    "GREEK": ("el", "greek"),
+    "ARABIC": ("ar", "fa", "ur", "arabic", "persian", "farsi", "urdu"),
+    "HEBREW": ("he", "iw", "hebrew"),
+    "HANGUL": ("ko", "korean"),
+    "CJK": ("zh", "chinese", "ja", "japanese"),
+    "THAI": ("th", "thai"),
+    "DEVANAGARI": ("hi", "mr", "ne", "hindi", "marathi", "nepali"),
+}
+_EXTRA_SCRIPTS = {"ja": ("HIRAGANA", "KATAKANA"), "japanese": ("HIRAGANA", "KATAKANA")}
+
+# Labels and asides a model adds when it talks instead of translating, and stray cue ids
+LEAK_RE = re.compile(
+    r"(?i)^\s*(?:<\d+>\s*)*(?:(?:translation|translated text|note|alternatively)\s*:|as an ai\b)"
+    r"|\(\s*(?:translation|note)\s*:"
+    r"|\[\s*\d+(:\d+)?\s*\]"
+)
+
+# Characters per Latin-letter equivalent, for comparing lengths across scripts
+_WIDE_SCRIPTS = {"CJK": 3, "HIRAGANA": 3, "KATAKANA": 3, "HANGUL": 2}
+
+def expected_scripts(target_lang):
+    """
+    Return the Unicode scripts a translation into target_lang should use, or None if unknown.
+    """
+    lang = (target_lang or "").strip().lower()
+    for script, langs in _SCRIPTS.items():
+        if lang in langs:
+            return (script,) + _EXTRA_SCRIPTS.get(lang, ())
+    return None
+
+def _script_share(text, scripts):
+    letters = [ch for ch in text if ch.isalpha()]
+    if not letters:
+        return 1.0
+    hits = sum(1 for ch in letters if unicodedata.name(ch, "").split(" ")[0] in scripts)
+    return hits / len(letters)
+
+def _plain(text):
+    return " ".join(re.sub(r"<\d+>", " ", text).lower().split())
+
+def _weighted_len(text):
+    """
+    Length with CJK, kana and Hangul characters counted as the Latin letters they stand for.
+    """
+    total = 0
+    for ch in text:
+        if ord(ch) < 0x1100:
+            total += 1
+        else:
+            total += _WIDE_SCRIPTS.get(unicodedata.name(ch, "").split(" ")[0], 1)
+    return total
+
+def check_cue(source, translated, table, target_lang, min_ratio=0.3, max_ratio=3.0):
+    """
+    Return the problems found in one translated cue (empty list if it looks fine).
+
+    source and translated are placeholder-masked texts; table is the markup
+    table from mask_markup(). Problems: "empty", "untranslated", "script",
+    "length", "leak", "placeholders". Lengths are compared with dense
+    scripts (CJK, kana, Hangul) weighted, so the ratio bounds hold across
+    scripts.
+    """
+    issues = []
+    if not translated.strip():
+        return ["empty"]
+    src, out = _plain(source), _plain(translated)
+    # Short lines ("John!", "OK.") are often legitimately identical
+    if src == out and len(re.findall(r"[^\W\d_]{2,}", src)) >= 3:
+        issues.append("untranslated")
+    scripts = expected_scripts(target_lang)
+    if scripts and _script_share(translated, scripts) < 0.5:
+        issues.append("script")
+    src_len = _weighted_len(src)
+    if src_len >= 12 and not min_ratio <= _weighted_len(out) / src_len <= max_ratio:
+        issues.append("length")
+    if LEAK_RE.search(translated) and not LEAK_RE.search(source):
+        issues.append("leak")
+    if not placeholders_intact(translated, table):
+        issues.append("placeholders")
+    return issues
+
+def check_chunk(sources, translated, target_lang):
+    """
+    Check a chunk's answers; returns {id: [problems]} for suspect cues.
+
+    sources maps each id that was sent to (masked_text, table); ids with
+    no answer are reported as "missing".
+    """
+    suspects = {}
+    for entry_id, (source, table) in sources.items():
+        if entry_id not in translated:
+            suspects[entry_id] = ["missing"]
+            continue
+        issues = check_cue(source, translated[entry_id], table, target_lang)
+        if issues:
+            suspects[entry_id] = issues
+    return suspects
+
+class QualityReport:
+    """
+    Per-job tally of suspect cues, how many were re-queued and how many that fixed.
+    """
+
+    def __init__(self):
+        self.checked = 0
+        self.problems = {}  # problem: count, on first answers
+        self.requeued = 0
+        self.fixed = 0
+        self.remaining = []  # ids still suspect after the re-queue
+        self._lock = threading.Lock()
+
+    def add(self, checked, suspects, fixed, remaining, requeued=True):
+        with self._lock:
+            self.checked += checked
+            for issues in suspects.values():
+                for issue in issues:
+                    self.problems[issue] = self.problems.get(issue, 0) + 1
+            if requeued:
+                self.requeued += len(suspects)
+            self.fixed += len(fixed)
+            self.remaining.extend(remaining)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "problems": dict(self.problems),
+                "requeued": self.requeued,
+                "fixed": self.fixed,
+                "remaining": sorted(self.remaining, key=str)
+            }
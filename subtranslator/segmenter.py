@@ -0,0 +1,80 @@
+import re
+
+_SENTENCE_END = (".", "!", "?", "♪", '"', "»", ")")
+_TAG_RE = re.compile(r"<[^>]*>|\{[^}]*\}")
+
+def _clean(text):
+    return _TAG_RE.sub("", text).strip()
+
+def boundary_score(current, following):
+    """
+    Score how natural it is to split between two cues; higher is better.
+
+    Long silences score highest. A finished sentence or a following
+    speaker dash adds to the score; a sentence that carries on into the
+    next cue (trailing comma, no final punctuation, lowercase or "..."
+    continuation) makes the split very unlikely to be chosen.
+    """
+    gap = max(0.0, (following.start.ordinal - current.end.ordinal) / 1000.0)
+    score = min(gap, 10.0)
+    text = _clean(current.text)
+    next_text = _clean(following.text)
+    if text.endswith(("...", "…")) and next_text.startswith(("...", "…")):
+        return score - 20
+    if text.endswith(_SENTENCE_END):
+        score += 1
+    else:
+        score -= 5
+    if next_text[:1].islower():
+        score -= 5
+    if next_text.startswith("-"):
+        score += 0.5
+    return score
+
+def split_scenes(subs, max_chars=2000, texts=None, scene_gap=3.0, indices=None):
+    """
+    Yield batches of (index, text) that end at natural scene or dialogue boundaries.
+
+    A batch is closed at a silence of at least scene_gap seconds once it
+    holds a quarter of max_chars. When the next cue would overflow
+    max_chars, the batch is cut at its best-scoring boundary past the
+    halfway mark instead of after the last cue that fits. Batches carry no
+    context lines. indices limits the cues that are segmented.
+    """
+    if texts is None:
+        texts = [sub.text for sub in subs]
+    if indices is None:
+        indices = range(len(texts))
+    batch = []  # indices
+    scores = []  # scores[i]: split after batch[i]
+    batch_len = 0
+    for idx in indices:
+        text = texts[idx]
+        if batch:
+            score = boundary_score(subs[batch[-1]], subs[idx])
+            gap = (subs[idx].start.ordinal - subs[batch[-1]].end.ordinal) / 1000.0
+            if gap >= scene_gap and score > 0 and batch_len >= max_chars // 4:
+                yield [(i, texts[i]) for i in batch]
+                batch, scores, batch_len = [], [], 0
+            while batch and batch_len + len(text) > max_chars:
+                # Cut at the most natural boundary in the second half, latest on ties
+                filled = 0
+                candidates = []
+                for pos, i in enumerate(batch[:-1]):
+                    filled += len(texts[i])
+                    if filled >= max_chars // 2 and scores[pos] >= 0:
+                        candidates.append(pos)
+                if candidates:
+                    cut = max(candidates, key=lambda pos: (scores[pos], pos))
+                else:
+                    cut = len(batch) - 1
+                yield [(i, texts[i]) for i in batch[:cut + 1]]
+                batch = batch[cut + 1:]
+                scores = scores[cut + 1:]
+                batch_len = sum(len(texts[i]) for i in batch)
+            if batch:
+                scores.append(score)
+        batch.append(idx)
+        batch_len += len(text)
+    if batch:
+        yield [(i, texts[i]) for i in batch]
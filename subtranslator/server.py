@@ -0,0 +1,312 @@
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from subtranslator.api_manager import APIKeyManager
+from subtranslator.config_manager import JOBS_DIR, JOBS_FILE, load_state_file, save_state_file
+from subtranslator.translator import load_subtitles
+from subtranslator.engine import JobConfig, TranslationEngine
+from subtranslator.prompts import CENSORSHIP_RULES
+from subtranslator.progressive import ProgressiveSRTWriter
+
+# Language names ("Brazilian Portuguese") and codes ("pt-BR"): letters, spaces and hyphens only
+LANG_RE = re.compile(r"^[^\W\d_]+(?:[ -][^\W\d_]+)*$")
+MAX_LANG_LEN = 40
+
+def lang_slug(lang):
+    """
+    Return the file name part for a target language, e.g. "brazilian-portuguese".
+    """
+    return "-".join(lang.lower().split())
+
+class JobQueue:
+    """
+    Persistent translation job queue served by a shared worker pool.
+
+    Jobs may name a server-side file instead of sending SRT content only
+    when input_root is set, and only files inside it.
+    """
+
+    def __init__(self, api_manager=None, max_workers=2, jobs_file=JOBS_FILE, jobs_dir=JOBS_DIR, chunk_workers=1,
+                 glossary_file=None, memory_file=None, input_root=None, cascade_timeout=None):
+        self.api_manager = api_manager or APIKeyManager()
+        self.input_root = os.path.realpath(input_root) if input_root else None
+        self.chunk_workers = chunk_workers
+        self.glossary_file = glossary_file
+        self.memory_file = memory_file
+        self.cascade_timeout = cascade_timeout
+        self.jobs_file = jobs_file
+        self.jobs_dir = jobs_dir
+        self.jobs = load_state_file(jobs_file)  # id: job dict
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        os.makedirs(jobs_dir, exist_ok=True)
+        # Re-queue work interrupted by a restart
+        for job_id, job in self.jobs.items():
+            if job["status"] in ("queued", "running"):
+                job["status"] = "queued"
+                self._executor.submit(self._run, job_id)
+
+    def _save(self):
+        save_state_file(self.jobs_file, self.jobs)
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self.jobs[job_id].update(fields)
+            self._save()
+
+    def submit(self, target_langs, model_name, srt_text=None, path=None, censorship=False):
+        if not isinstance(target_langs, (list, tuple)) or not target_langs:
+            raise ValueError("target_langs must be a non-empty list.")
+        if not isinstance(model_name, str) or not model_name:
+            raise ValueError("model is required.")
+        if not (censorship is None or isinstance(censorship, bool)
+                or isinstance(censorship, str) and censorship in CENSORSHIP_RULES):
+            raise ValueError(f"Unknown censorship level: {censorship!r}")
+        if srt_text is not None and not isinstance(srt_text, str):
+            raise ValueError("srt must be a string.")
+        if path is not None and not isinstance(path, str):
+            raise ValueError("path must be a string.")
+        if srt_text is None and not path:
+            raise ValueError("Provide either SRT content or a path.")
+        for lang in target_langs:
+            if not isinstance(lang, str) or len(lang) > MAX_LANG_LEN or not LANG_RE.match(lang):
+                raise ValueError(f"Invalid target language: {lang!r}")
+        if len({lang_slug(lang) for lang in target_langs}) < len(target_langs):
+            raise ValueError("target_langs contains the same language twice.")
+        if srt_text is None:
+            path = self._resolve_input(path)
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        input_path = os.path.join(job_dir, "input.srt")
+        if srt_text is not None:
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(srt_text)
+        else:
+            if not os.path.isfile(path):
+                shutil.rmtree(job_dir, ignore_errors=True)
+                raise ValueError(f"File not found: {path}")
+            shutil.copyfile(path, input_path)
+        with self._lock:
+            self.jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "input": input_path,
+                "target_langs": list(target_langs),
+                "model": model_name,
+                "censorship": censorship,
+                "progress": {"done": 0, "total": 0},
+                "outputs": {},
+                "error": None,
+                "created_at": time.time()
+            }
+            self._save()
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def _resolve_input(self, path):
+        if not self.input_root:
+            raise ValueError("Server-side paths are disabled; send SRT content instead.")
+        real_path = os.path.realpath(os.path.join(self.input_root, path))
+        if os.path.commonpath([self.input_root, real_path]) != self.input_root:
+            raise ValueError(f"Path is outside the input root: {path}")
+        return real_path
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        self._update(job_id, status="running", started_at=time.time())
+        engine = TranslationEngine(self.api_manager)
+        censorship = job["censorship"]
+        if censorship is True:
+            censorship = "mask"
+        outputs = {}
+        routing_by_lang = {}  # lang: per-model routing counts
+        quality_by_lang = {}  # lang: quality gate report
+        try:
+            langs = job["target_langs"]
+            for lang_num, lang in enumerate(langs):
+                subs = load_subtitles(job["input"])
+                config = JobConfig(
+                    lang, job["model"], censorship_level=censorship or None,
+                    max_workers=self.chunk_workers,
+                    glossary_file=self.glossary_file, memory_file=self.memory_file,
+                    cascade_timeout=self.cascade_timeout
+                )
+                # Written progressively so partial results can be fetched while running
+                out_path = os.path.join(os.path.dirname(job["input"]), f"result-{lang_slug(lang)}.srt")
+                writer = ProgressiveSRTWriter(out_path)
+                outputs[lang] = out_path
+                self._update(job_id, outputs=dict(outputs))
+
+                def on_event(event, subs=subs, writer=writer, lang_num=lang_num):
+                    if event["type"] != "batch":
+                        return
+                    writer.add(event["batch"], [subs[i] for i in event["indices"]])
+                    self._update(job_id, progress={
+                        "done": lang_num * event["total"] + event["done"],
+                        "total": len(langs) * event["total"]
+                    })
+
+                result = engine.run(subs, config, on_event=on_event)
+                subs.save(out_path, encoding='utf-8')
+                routing_by_lang[lang] = result["routing"]
+                quality_by_lang[lang] = result["quality"]
+                self._update(job_id, routing=dict(routing_by_lang), quality=dict(quality_by_lang))
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            return
+        self._update(job_id, status="done", finished_at=time.time())
+
+    def metrics(self):
+        metrics = {}
+        limiter = getattr(self.api_manager, "limiter", None)
+        if limiter:
+            metrics["concurrency"] = limiter.stats()
+        if hasattr(self.api_manager, "hedge_delay"):
+            metrics["hedging"] = self.api_manager.stats()
+        with self._lock:
+            statuses = [job["status"] for job in self.jobs.values()]
+        metrics["jobs"] = {status: statuses.count(status) for status in set(statuses)}
+        return metrics
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes:
+        POST /jobs                  submit (JSON body, or raw SRT body with query options)
+        GET  /jobs                  list jobs
+        GET  /metrics               concurrency limit and hedging counters
+        GET  /jobs/<id>             job status and progress
+        GET  /jobs/<id>/result      translated SRT (?lang= when several targets,
+                                    ?partial=1 for the translated prefix while running)
+    """
+    queue = None  # set by make_server
+
+    def log_message(self, format, *args):
+        print(f"[Server] {self.address_string()} {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _public(self, job):
+        public = {k: v for k, v in job.items() if k not in ("input", "outputs")}
+        public["results"] = sorted(job["outputs"])
+        return public
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length < 0:
+                raise ValueError("Invalid Content-Length.")
+        except ValueError:
+            return self._send_json(400, {"error": "Invalid Content-Length."})
+        raw = self.rfile.read(length)
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                data = json.loads(raw.decode("utf-8") or "{}")
+                if not isinstance(data, dict):
+                    raise ValueError("JSON body must be an object.")
+                srt_text = data.get("srt")
+            else:
+                query = parse_qs(url.query)
+                data = {k: v[-1] for k, v in query.items()}
+                data["target_langs"] = query.get("target_lang", [])
+                srt_text = raw.decode("utf-8-sig") or None
+            langs = data.get("target_langs") or data.get("target_lang") or []
+            if isinstance(langs, str):
+                langs = [langs]
+            # true/false, or a level: low, medium, high, mask
+            censorship = data.get("censorship", False)
+            if isinstance(censorship, str):
+                censorship = censorship.lower()
+                if censorship in ("1", "true", "yes"):
+                    censorship = True
+                elif censorship in ("", "0", "false", "no"):
+                    censorship = False
+            job_id = self.queue.submit(
+                langs, data.get("model"), srt_text=srt_text,
+                path=data.get("path"), censorship=censorship
+            )
+        except ValueError as e:
+            return self._send_json(400, {"error": str(e)})
+        self._send_json(202, {"id": job_id})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["metrics"]:
+            return self._send_json(200, self.queue.metrics())
+        if parts == ["jobs"]:
+            return self._send_json(200, [self._public(j) for j in self.queue.list()])
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "Not found"})
+        job = self.queue.get(parts[1])
+        if not job:
+            return self._send_json(404, {"error": "Unknown job"})
+        if len(parts) == 2:
+            return self._send_json(200, self._public(job))
+        if parts[2:] != ["result"]:
+            return self._send_json(404, {"error": "Not found"})
+        query = parse_qs(url.query)
+        partial = query.get("partial", ["0"])[-1].lower() in ("1", "true", "yes")
+        if job["status"] != "done" and not (partial and job["status"] == "running"):
+            return self._send_json(409, {"error": f"Job is {job['status']}"})
+        lang = query.get("lang", [job["target_langs"][0]])[-1]
+        out_path = job["outputs"].get(lang)
+        if not out_path or not os.path.isfile(out_path):
+            return self._send_json(404, {"error": f"No result for {lang}"})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-subrip; charset=utf-8")
+        self.send_header("Content-Length", str(os.path.getsize(out_path)))
+        self.end_headers()
+        with open(out_path, "rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+def make_server(host="127.0.0.1", port=8765, queue=None, max_workers=2, api_manager=None, chunk_workers=1,
+                glossary_file=None, memory_file=None, input_root=None, cascade_timeout=None):
+    handler = type("BoundJobRequestHandler", (JobRequestHandler,), {
+        "queue": queue or JobQueue(api_manager=api_manager, max_workers=max_workers, chunk_workers=chunk_workers,
+                                   glossary_file=glossary_file, memory_file=memory_file, input_root=input_root,
+                                   cascade_timeout=cascade_timeout)
+    })
+    return ThreadingHTTPServer((host, port), handler)
+
+def serve(host="127.0.0.1", port=8765, max_workers=2, api_manager=None, chunk_workers=1, glossary_file=None,
+          memory_file=None, input_root=None, cascade_timeout=None):
+    server = make_server(host, port, max_workers=max_workers, api_manager=api_manager, chunk_workers=chunk_workers,
+                         glossary_file=glossary_file, memory_file=memory_file, input_root=input_root,
+                         cascade_timeout=cascade_timeout)
+    print(f"[Server] Listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.RequestHandlerClass.queue.shutdown()
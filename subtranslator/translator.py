@@ -1,5 +1,8 @@
+import os
 import pysrt
 from subtranslator.api_manager import APIKeyManager
+from subtranslator.engine import JobConfig, TranslationEngine
+from subtranslator.progressive import ProgressiveSRTWriter
 
 def load_subtitles(file_path):
     try:
@@ -15,76 +18,126 @@ def validate_subtitles(subs):
             raise ValueError(f"Invalid subtitle entry: {sub.index}")
     return True
 
-def batch_subtitles(subs, max_chars=2000, context_size=2):
+def translate_subtitles(subs, target_lang, api_manager: APIKeyManager, model_name, censorship=False, safety_settings=None, progress_callback=None, glossary=None, style_notes=None, max_workers=1, batch_callback=None, indices=None, censorship_level=None, glossary_file=None, memory_file=None, require_complete=False, cascade_timeout=None):
     """
-    Yield batches of subtitle entries as text chunks with context.
+    Translate subtitles in batches, update subs in place.
+
+    Thin wrapper over TranslationEngine. indices restricts translation to
+    those entries (others are left as is). model_name may also be a
+    comma-separated string, a list of models or a ModelCascade. With
+    max_workers > 1 batches run concurrently and batch_callback(batch_num,
+    indices) may fire out of order. glossary_file keeps recurring terms
+    translated once across files; memory_file reuses earlier translations
+    of near-duplicate lines. With require_complete, a RuntimeError is
+    raised if any cue came back untranslated. cascade_timeout moves a
+    chunk to the next model after that many seconds. Returns the per-model
+    routing counts.
     """
-    batch = []
-    batch_len = 0
-    for idx, sub in enumerate(subs):
-        # Include previous context_size entries
-        context = ''
-        for offset in range(context_size, 0, -1):
-            if idx - offset >= 0:
-                context += subs[idx - offset].text + ' '
-        entry_text = context + sub.text
+    config = JobConfig(
+        target_lang, model_name,
+        censorship_level=censorship_level or ("mask" if censorship else None),
+        glossary=glossary, style_notes=style_notes,
+        max_workers=max_workers, safety_settings=safety_settings, glossary_file=glossary_file,
+        memory_file=memory_file, cascade_timeout=cascade_timeout
+    )
 
-        if batch_len + len(entry_text) > max_chars and batch:
-            yield batch
-            batch = []
-            batch_len = 0
+    def on_event(event):
+        if event["type"] != "batch":
+            return
+        if batch_callback:
+            batch_callback(event["batch"], event["indices"])
+        if progress_callback:
+            progress_callback(event["done"], event["total"])
 
-        batch.append((idx, entry_text))
-        batch_len += len(entry_text)
+    result = TranslationEngine(api_manager).run(subs, config, indices=indices, on_event=on_event)
+    if require_complete and result["untranslated"]:
+        raise RuntimeError(
+            f"{result['untranslated']} cues were not translated "
+            f"({result['failed_batches']} batches failed)"
+        )
+    return result["routing"]
 
-    if batch:
-        yield batch
+def save_translated_subs(subs, original_path, target_lang):
+    base, ext = os.path.splitext(original_path)
+    out_path = f"{base}_{target_lang}{ext}"
+    subs.save(out_path, encoding='utf-8')
+    return out_path
 
-def translate_subtitles(subs, target_lang, api_manager: APIKeyManager, model_name, censorship=False, safety_settings=None, progress_callback=None):
+def translate_file(input_path, target_lang, api_manager: APIKeyManager, model_name, output_dir, censorship=False, progress_callback=None, max_workers=1, progressive=False, glossary_file=None, memory_file=None, require_complete=False, cascade_timeout=None, out_path=None):
     """
-    Translate subtitles in batches, update subs in place.
+    Load, translate and save a single .srt file into output_dir.
+
+    out_path overrides the default <output_dir>/<name>_translated.srt.
+    With progressive, a <name>.partial.srt next to it grows in timeline
+    order while translation runs and is always a valid, correctly numbered
+    SRT; it is removed once the file is saved or the translation fails.
+    With require_complete, a file with untranslated cues raises
+    RuntimeError instead of being saved.
     """
-    total = len(subs)
-    batch_num = 0
+    subs = load_subtitles(input_path)
+    if out_path is None:
+        out_path = output_paths([input_path], output_dir)[0]
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    batch_callback = None
+    partial_path = None
+    if progressive:
+        partial_path = os.path.splitext(out_path)[0] + ".partial.srt"
+        writer = ProgressiveSRTWriter(partial_path)
+        batch_callback = lambda batch_num, indices: writer.add(batch_num, [subs[i] for i in indices])
+    try:
+        translate_subtitles(
+            subs, target_lang, api_manager, model_name, censorship=censorship,
+            progress_callback=progress_callback, max_workers=max_workers, batch_callback=batch_callback,
+            glossary_file=glossary_file, memory_file=memory_file, require_complete=require_complete,
+            cascade_timeout=cascade_timeout
+        )
+        subs.save(out_path, encoding='utf-8')
+    finally:
+        if partial_path and os.path.exists(partial_path):
+            os.remove(partial_path)
+    return out_path
 
-    for batch in batch_subtitles(subs):
-        batch_num += 1
-        prompt = f"Translate the following subtitles into {target_lang}, preserving meaning and adapting idioms naturally:\n\n"
-        for idx, text in batch:
-            prompt += f"[{idx}] {text}\n"
+def output_paths(input_paths, output_dir, root=None):
+    """
+    Return the translated file path in output_dir for each input path.
 
-        # Add censorship instructions if enabled
-        if censorship:
-            prompt += "\nCensor any NSFW or offensive content by replacing it with '####'."
+    Inputs keep their folder layout below root (by default the folder they
+    all share), so files with the same name from different folders do not
+    collide.
+    """
+    dirs = [os.path.dirname(os.path.abspath(path)) for path in input_paths]
+    if root is None:
+        root = os.path.commonpath(dirs) if dirs else ""
+    paths = []
+    for path, directory in zip(input_paths, dirs):
+        base_name = os.path.splitext(os.path.basename(path))[0]
+        paths.append(os.path.normpath(
+            os.path.join(output_dir, os.path.relpath(directory, root), f"{base_name}_translated.srt")
+        ))
+    return paths
 
-        try:
-            response = api_manager.call_gemini_api(
-                model_name=model_name,
-                prompt=prompt,
-                safety_settings=safety_settings
-            )
-            translated_text = response.text
-        except Exception as e:
-            print(f"Batch {batch_num} translation failed: {e}")
-            continue
+def translate_files(input_paths, target_lang, api_manager: APIKeyManager, model_name, output_dir, censorship=False, progress_callback=None, max_workers=1, glossary_file=None, memory_file=None, cascade_timeout=None):
+    """
+    Translate many short .srt files together, packing their cues into shared requests.
 
-        # Parse response and update subtitles
-        # Assumes response returns lines like: [idx] translated text
-        for line in translated_text.splitlines():
-            if line.strip().startswith("[") and "]" in line:
-                try:
-                    idx_str = line.split("]")[0][1:]
-                    idx = int(idx_str)
-                    text = line.split("]", 1)[1].strip()
-                    subs[idx].text = text
-                except Exception:
-                    continue
+    Each file is saved into output_dir like translate_file, below the
+    subfolder it has relative to the other inputs (see output_paths).
+    Returns the output paths and the number of requests sent.
+    """
+    files = [(path, load_subtitles(path)) for path in input_paths]
+    config = JobConfig(
+        target_lang, model_name, censorship_level="mask" if censorship else None,
+        max_workers=max_workers, glossary_file=glossary_file, memory_file=memory_file,
+        cascade_timeout=cascade_timeout
+    )
 
-        if progress_callback:
-            progress_callback(min(batch[-1][0]+1, total), total)
+    def on_event(event):
+        if event["type"] == "request" and progress_callback:
+            progress_callback(event["done"], event["total"])
 
-def save_translated_subs(subs, original_path, target_lang):
-    base, ext = os.path.splitext(original_path)
-    out_path = f"{base}_{target_lang}{ext}"
-    subs.save(out_path, encoding='utf-8')
-    return out_path
+    result = TranslationEngine(api_manager).run_many(files, config, on_event=on_event)
+    out_paths = output_paths(input_paths, output_dir)
+    for (_, subs), out_path in zip(files, out_paths):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        subs.save(out_path, encoding='utf-8')
+    return out_paths, result["requests"]
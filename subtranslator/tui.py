@@ -6,6 +6,7 @@ MENU_ITEMS = [
     "Censorship Settings",
     "Manage API keys",
     "Fetch available Gemini models",
+    "Toggle progressive output",
     "Start translation",
     "Exit"
 ]
@@ -127,6 +128,14 @@ def toggle_censorship(stdscr, state):
     stdscr.refresh()
     stdscr.getch()
 
+def toggle_progressive_output(stdscr, state):
+    state['progressive_output'] = not state.get('progressive_output', False)
+    stdscr.clear()
+    status = "enabled" if state['progressive_output'] else "disabled"
+    stdscr.addstr(2, 2, f"Progressive output {status}. Output/ will grow as chunks finish.")
+    stdscr.refresh()
+    stdscr.getch()
+
 from subtranslator.api_manager import APIKeyManager
 
 import json
@@ -478,7 +487,53 @@ def fetch_gemini_models(stdscr, api_manager, state):
         elif key == 27:  # ESC
             break
 
+import time
 import pysrt
+from subtranslator.engine import JobConfig, TranslationEngine
+from subtranslator.progressive import ProgressiveSRTWriter
+
+def draw_translation_progress(stdscr, api_manager, event, job_start, last_error):
+    stdscr.clear()
+
+    batches_done = event["batches_done"] if event else 0
+    batches_total = event["batches_total"] if event else 0
+
+    # Progress bar
+    bar_width = 40
+    progress = batches_done / batches_total if batches_total else 0
+    filled = int(bar_width * progress)
+    bar = "[" + "#" * filled + "-" * (bar_width - filled) + "]"
+
+    # ETA and debug info
+    if batches_done:
+        avg_time = (time.time() - job_start) / batches_done
+        eta_seconds = int(avg_time * (batches_total - batches_done))
+        eta_min = eta_seconds // 60
+        eta_sec = eta_seconds % 60
+        eta_str = f"{eta_min}m {eta_sec}s"
+        last_str = f"{event['elapsed']:.1f}s"
+        avg_str = f"{avg_time:.1f}s"
+        status = f"Translated chunk {batches_done}/{batches_total}"
+    else:
+        eta_str = "Calculating..."
+        last_str = "-"
+        avg_str = "-"
+        status = "Translating..."
+
+    stdscr.addstr(2, 2, status)
+    stdscr.addstr(3, 2, bar)
+    stdscr.addstr(4, 2, f"ETA: {eta_str}")
+    stdscr.addstr(5, 2, f"Chunks timed: {batches_done}")
+    stdscr.addstr(6, 2, f"Last chunk: {last_str}")
+    stdscr.addstr(7, 2, f"Avg chunk: {avg_str}")
+    limiter = getattr(api_manager, 'limiter', None)
+    if limiter:
+        limits = limiter.stats()
+        stdscr.addstr(8, 2, f"Concurrency limit: {limits['limit']} (in flight: {limits['in_flight']})")
+    if last_error:
+        h, w = stdscr.getmaxyx()
+        stdscr.addstr(10, 2, f"Error: {last_error}"[:w - 4])
+    stdscr.refresh()
 
 def start_translation(stdscr, api_manager, state):
     stdscr.clear()
@@ -501,154 +556,44 @@ def start_translation(stdscr, api_manager, state):
         stdscr.getch()
         return
 
-    temp_dir = os.path.join(os.getcwd(), "Temp")
     output_dir = os.path.join(os.getcwd(), "Output")
-    os.makedirs(temp_dir, exist_ok=True)
     os.makedirs(output_dir, exist_ok=True)
-
-    total = len(subs)
-    chunks = [subs[i:i+10] for i in range(0, total, 10)]
-    part_files = []
-    import time
-    times = []
-    total_chunks = len(chunks)
-
-    for idx, chunk in enumerate(chunks):
-        stdscr.clear()
-
-        # Progress bar
-        bar_width = 40
-        progress = (idx) / total_chunks
-        filled = int(bar_width * progress)
-        bar = "[" + "#" * filled + "-" * (bar_width - filled) + "]"
-
-        # ETA and debug info
-        if times:
-            avg_time = sum(times) / len(times)
-            eta_seconds = int(avg_time * (total_chunks - idx))
-            eta_min = eta_seconds // 60
-            eta_sec = eta_seconds % 60
-            eta_str = f"{eta_min}m {eta_sec}s"
-            last_time = times[-1]
-            last_str = f"{last_time:.1f}s"
-            avg_str = f"{avg_time:.1f}s"
-        else:
-            eta_str = "Calculating..."
-            last_str = "-"
-            avg_str = "-"
-
-        stdscr.addstr(2, 2, f"Translating chunk {idx+1}/{total_chunks}")
-        stdscr.addstr(3, 2, bar)
-        stdscr.addstr(4, 2, f"ETA: {eta_str}")
-        stdscr.addstr(5, 2, f"Chunks timed: {len(times)}")
-        stdscr.addstr(6, 2, f"Last chunk: {last_str}")
-        stdscr.addstr(7, 2, f"Avg chunk: {avg_str}")
-        stdscr.refresh()
-
-        chunk_start = time.time()
-
-        # Renumber chunk subtitles from 1 upwards
-        for i, sub in enumerate(chunk, start=1):
-            sub.index = i
-
-        if state.get('censorship_enabled'):
-            level = state.get('censorship_level', 'medium')
-            if level == 'low':
-                prompt = (
-                    f"Translate the following subtitles into {target_lang}.\n\n"
-                    "- Replace only highly offensive or explicit terms with polite equivalents.\n"
-                    "- Preserve humor, tone, and mild slang.\n"
-                    "- Do NOT include explanations or alternatives.\n"
-                    "- Keep the numbering format: [number] translated text.\n"
-                    "- Do not output anything else.\n\n"
-                )
-            elif level == 'medium':
-                prompt = (
-                    f"Translate the following subtitles into {target_lang}.\n\n"
-                    "- Replace explicit, offensive, or suggestive language with polite or neutral terms.\n"
-                    "- Maintain overall tone but avoid inappropriate content.\n"
-                    "- Do NOT include explanations or alternatives.\n"
-                    "- Keep the numbering format: [number] translated text.\n"
-                    "- Do not output anything else.\n\n"
-                )
-            elif level == 'high':
-                prompt = (
-                    f"Translate the following subtitles into {target_lang}.\n\n"
-                    "- Aggressively censor all NSFW, offensive, or suggestive language.\n"
-                    "- Replace with family-friendly, polite expressions.\n"
-                    "- Maintain timing and formatting.\n"
-                    "- Do NOT include explanations or alternatives.\n"
-                    "- Keep the numbering format: [number] translated text.\n"
-                    "- Do not output anything else.\n\n"
-                )
-            else:
-                prompt = ""
-        else:
-            prompt = (
-                f"Translate the following subtitles into {target_lang}.\n\n"
-                "- Provide ONLY ONE natural, idiomatic translation per line.\n"
-                "- Do NOT include explanations, alternatives, or comments.\n"
-                "- Keep the numbering format: [number] translated text.\n"
-                "- If unsure, pick the most neutral, natural-sounding translation.\n"
-                "- Do not output anything else.\n\n"
-            )
-        for sub in chunk:
-            prompt += f"[{sub.index}] {sub.text}\n"
-
-        try:
-            response = api_manager.call_gemini_api(
-                model_name=model_name,
-                prompt=prompt
-            )
-            translated_text = response.text
-        except Exception as e:
-            stdscr.addstr(4, 2, f"Error: {e}")
-            stdscr.refresh()
-            stdscr.getch()
-            continue
-
-        elapsed = time.time() - chunk_start
-        times.append(elapsed)
-
-        # Parse response and update chunk
-        for line in translated_text.splitlines():
-            if line.strip().startswith("[") and "]" in line:
-                try:
-                    idx_str = line.split("]")[0][1:]
-                    idx_num = int(idx_str)
-                    text = line.split("]", 1)[1].strip()
-                    for sub in chunk:
-                        if sub.index == idx_num:
-                            sub.text = text
-                            break
-                except:
-                    continue
-
-        # Save translated chunk to Temp/
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        out_path = os.path.join(temp_dir, f"{base_name}_translated_part{idx+1}.srt")
-        chunk.save(out_path, encoding='utf-8')
-        part_files.append(out_path)
-
-    # Merge parts into one .srt in Output/
-    merged_subs = pysrt.SubRipFile()
-    counter = 1
-    for part_file in part_files:
-        part_subs = pysrt.open(part_file, encoding='utf-8')
-        for sub in part_subs:
-            sub.index = counter
-            merged_subs.append(sub)
-            counter += 1
-
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
     final_out_path = os.path.join(output_dir, f"{base_name}_translated.srt")
-    merged_subs.save(final_out_path, encoding='utf-8')
 
-    # Clean up Temp/ .srt files
-    for f in part_files:
-        try:
-            os.remove(f)
-        except:
-            pass
+    censorship_level = None
+    if state.get('censorship_enabled'):
+        censorship_level = state.get('censorship_level', 'medium')
+    config = JobConfig(
+        target_lang, model_name,
+        censorship_level=censorship_level,
+        style_notes=state.get('style_notes'),
+        max_workers=state.get('chunk_workers', 1),
+        glossary_file=state.get('glossary_file'),
+        memory_file=state.get('memory_file'),
+        cascade_timeout=state.get('cascade_timeout')
+    )
+
+    writer = None
+    if state.get('progressive_output'):
+        # Output/ grows chunk by chunk instead of being written at the end
+        writer = ProgressiveSRTWriter(final_out_path)
+    job_start = time.time()
+    last_error = [None]
+
+    def on_event(event):
+        if event["type"] != "batch":
+            return
+        if event["failed"]:
+            last_error[0] = event["error"]
+        if writer:
+            writer.add(event["batch"], [subs[i] for i in event["indices"]])
+        draw_translation_progress(stdscr, api_manager, event, job_start, last_error[0])
+
+    draw_translation_progress(stdscr, api_manager, None, job_start, None)
+    result = TranslationEngine(api_manager).run(subs, config, on_event=on_event)
+    subs.clean_indexes()
+    subs.save(final_out_path, encoding='utf-8')
 
     stdscr.clear()
     stdscr.addstr(2, 2, f"Translation complete. Final file saved as:")
@@ -658,16 +603,21 @@ def start_translation(stdscr, api_manager, state):
     if len(truncated) > max_len:
         truncated = truncated[:max_len - 3] + "..."
     stdscr.addstr(4, 4, truncated)
+    if result["failed_batches"]:
+        stdscr.addstr(6, 2, f"{result['failed_batches']} chunk(s) failed and kept their original text.")
+    elif result["untranslated"]:
+        stdscr.addstr(6, 2, f"{result['untranslated']} cue(s) got no answer and kept their original text.")
     stdscr.refresh()
     stdscr.getch()
 
-def main_menu(stdscr, api_manager):
+def main_menu(stdscr, api_manager, chunk_workers=1, glossary_file=None, memory_file=None, cascade_timeout=None):
     curses.curs_set(0)
     curses.start_color()
     curses.init_pair(1, curses.COLOR_BLACK, curses.COLOR_CYAN)
 
     selected_idx = 0
-    state = {}
+    state = {'chunk_workers': chunk_workers, 'glossary_file': glossary_file, 'memory_file': memory_file,
+             'cascade_timeout': cascade_timeout}
 
     while True:
         draw_menu(stdscr, selected_idx, state)
@@ -691,12 +641,14 @@ def main_menu(stdscr, api_manager):
                 manage_api_keys(stdscr, api_manager)
             elif label == "Fetch available Gemini models":
                 fetch_gemini_models(stdscr, api_manager, state)
+            elif label == "Toggle progressive output":
+                toggle_progressive_output(stdscr, state)
             elif label == "Start translation":
                 start_translation(stdscr, api_manager, state)
         elif key == 27:  # ESC key
             break
 
-def launch_tui():
+def launch_tui(api_manager=None, chunk_workers=1, glossary_file=None, memory_file=None, cascade_timeout=None):
     from subtranslator.api_manager import APIKeyManager
-    api_manager = APIKeyManager()
-    curses.wrapper(main_menu, api_manager)
+    api_manager = api_manager or APIKeyManager()
+    curses.wrapper(main_menu, api_manager, chunk_workers, glossary_file, memory_file, cascade_timeout)
@@ -1,3 +1,18 @@
 # utils.py - Utility functions for SubTranslator (logging, validation, encryption)
 
-# Placeholder for utility functions implementation
+import logging
+from subtranslator.config_manager import get_log_file
+
+def setup_logging(to_file=False):
+    """
+    Send pipeline messages to stderr, or to the log file while the curses TUI owns the screen.
+    """
+    if to_file:
+        handler = logging.FileHandler(get_log_file(), encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+    root = logging.getLogger("subtranslator")
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)
@@ -0,0 +1,163 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from subtranslator.api_manager import APIKeyManager
+from subtranslator.config_manager import WATCH_STATE_FILE, load_state_file, save_state_file
+from subtranslator.translator import output_paths, translate_file
+
+class FolderWatcher:
+    """
+    Poll input directories for new or changed .srt files and translate them
+    on a bounded worker pool, sharing one APIKeyManager across all files.
+
+    Outputs keep the path of their watch folder below the folder all watch
+    folders share, so same-named files from two folders do not collide.
+    A file counts as done only when every cue was translated. Failed files
+    are retried after retry_delay seconds, doubling each time, and given up
+    after max_attempts until the file changes again.
+    """
+
+    def __init__(self, input_dirs, output_dir, target_lang, model_name, api_manager=None,
+                 censorship=False, max_workers=2, max_queue=16, poll_interval=2.0,
+                 settle_seconds=3.0, state_file=WATCH_STATE_FILE, chunk_workers=1, progressive=False,
+                 glossary_file=None, memory_file=None, max_attempts=3, retry_delay=60.0,
+                 cascade_timeout=None):
+        self.input_dirs = [os.path.abspath(d) for d in input_dirs]
+        self.input_root = os.path.commonpath(self.input_dirs)
+        self.output_dir = os.path.abspath(output_dir)
+        self.target_lang = target_lang
+        self.model_name = model_name
+        self.api_manager = api_manager or APIKeyManager()
+        self.censorship = censorship
+        self.chunk_workers = chunk_workers
+        self.progressive = progressive
+        self.glossary_file = glossary_file
+        self.memory_file = memory_file
+        self.cascade_timeout = cascade_timeout
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.state_file = state_file
+        self.state = load_state_file(state_file)  # path: {mtime, size, status, output, attempts}
+        self._seen = {}  # path: (signature, first_seen_at) while waiting to settle
+        self._pending = {}  # path: Future
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def _signature(self, path):
+        st = os.stat(path)
+        return (st.st_mtime, st.st_size)
+
+    def _is_done(self, path, signature):
+        """
+        True if the file needs no work now: translated, backing off or given up.
+        """
+        entry = self.state.get(path)
+        if not entry or (entry.get("mtime"), entry.get("size")) != signature:
+            return False
+        if entry.get("status") == "done":
+            return True
+        attempts = entry.get("attempts", 1)
+        if attempts >= self.max_attempts:
+            return True
+        return time.time() < entry.get("finished_at", 0) + self.retry_delay * 2 ** (attempts - 1)
+
+    def scan(self):
+        """
+        Return files whose size and mtime have been stable for settle_seconds.
+        """
+        now = time.time()
+        ready = []
+        for input_dir in self.input_dirs:
+            os.makedirs(input_dir, exist_ok=True)
+            with os.scandir(input_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.endswith('.srt'):
+                        continue
+                    path = entry.path
+                    try:
+                        signature = self._signature(path)
+                    except OSError:
+                        continue
+                    if path in self._pending or self._is_done(path, signature):
+                        self._seen.pop(path, None)
+                        continue
+                    seen = self._seen.get(path)
+                    if not seen or seen[0] != signature:
+                        # New or still being written: restart the settle timer
+                        self._seen[path] = (signature, now)
+                    elif now - seen[1] >= self.settle_seconds:
+                        ready.append(path)
+        return ready
+
+    def _record(self, path, signature, status, output=None, error=None):
+        with self._lock:
+            attempts = 0
+            previous = self.state.get(path)
+            if status == "failed":
+                attempts = 1
+                if previous and (previous.get("mtime"), previous.get("size")) == tuple(signature):
+                    attempts += previous.get("attempts", 0)
+            self.state[path] = {
+                "mtime": signature[0],
+                "size": signature[1],
+                "status": status,
+                "output": output,
+                "error": error,
+                "attempts": attempts,
+                "finished_at": time.time()
+            }
+            save_state_file(self.state_file, self.state)
+            return attempts
+
+    def _process(self, path):
+        signature = self._signature(path)
+        try:
+            out_path = translate_file(
+                path, self.target_lang, self.api_manager, self.model_name,
+                self.output_dir, censorship=self.censorship,
+                max_workers=self.chunk_workers, progressive=self.progressive,
+                glossary_file=self.glossary_file, memory_file=self.memory_file, require_complete=True,
+                cascade_timeout=self.cascade_timeout,
+                out_path=output_paths([path], self.output_dir, root=self.input_root)[0]
+            )
+        except Exception as e:
+            print(f"[Watch] Failed {os.path.basename(path)}: {e}")
+            if self._record(path, signature, "failed", error=str(e)) >= self.max_attempts:
+                print(f"[Watch] Giving up on {os.path.basename(path)} after {self.max_attempts} attempts")
+            return None
+        print(f"[Watch] Translated {os.path.basename(path)} -> {out_path}")
+        self._record(path, signature, "done", output=out_path)
+        return out_path
+
+    def submit_ready(self):
+        for path, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[path]
+        for path in self.scan():
+            if len(self._pending) >= self.max_queue:
+                break
+            self._seen.pop(path, None)
+            self._pending[path] = self._executor.submit(self._process, path)
+
+    def run(self):
+        """
+        Block and keep translating until stop() is called or Ctrl+C.
+        """
+        print(f"[Watch] Watching {', '.join(self.input_dirs)} -> {self.output_dir}")
+        try:
+            while not self._stop.is_set():
+                self.submit_ready()
+                self._stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
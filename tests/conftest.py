@@ -0,0 +1,59 @@
+import re
+import time
+import types
+import pysrt
+import pytest
+from subtranslator import api_manager as api_manager_module
+from subtranslator.api_manager import APIKeyManager
+from subtranslator.providers import ProviderResponse
+
+class FakeProvider:
+    """
+    Keyless provider answering "[id] text" lines through translate(text); raises while fail is set.
+    """
+    supports_system_instruction = True
+    needs_keys = False
+
+    def __init__(self, translate=None):
+        self.translate = translate or (lambda text: "T:" + text)
+        self.fail = False
+        self.prompts = []
+
+    def forget_key(self, key):
+        pass
+
+    def generate(self, key, model_name, prompt, safety_settings=None, system_instruction=None, timeout=None):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise RuntimeError("service unavailable")
+        lines = []
+        for line in prompt.splitlines():
+            match = re.match(r"\s*\[([^\]]+)\]\s?(.*)", line)
+            if match:
+                lines.append(f"[{match.group(1)}] {self.translate(match.group(2))}")
+        return ProviderResponse("\n".join(lines))
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+@pytest.fixture
+def manager(monkeypatch, provider):
+    # No keys from the user's config and no real waiting between retries
+    monkeypatch.setattr(api_manager_module, "load_keys_data", lambda: {})
+    monkeypatch.setattr(api_manager_module, "time", types.SimpleNamespace(time=time.time, sleep=lambda s: None))
+    return APIKeyManager(provider=provider)
+
+def make_subs(texts, gap=1.0):
+    subs = pysrt.SubRipFile()
+    for n, text in enumerate(texts):
+        start = int(n * (2 + gap) * 1000)
+        subs.append(pysrt.SubRipItem(
+            index=n + 1, start=pysrt.SubRipTime.from_ordinal(start),
+            end=pysrt.SubRipTime.from_ordinal(start + 2000), text=text
+        ))
+    return subs
+
+def write_srt(path, texts):
+    make_subs(texts).save(str(path), encoding="utf-8")
+    return str(path)
@@ -0,0 +1,22 @@
+import pytest
+from subtranslator.concurrency import AdaptiveLimiter
+
+def test_failing_bookkeeping_releases_limiter_once(manager):
+    manager.api_keys = ["key-0123456789"]
+    manager.limiter = AdaptiveLimiter(initial=2)
+
+    def broken(key):
+        raise OSError("disk full")
+
+    manager.record_success = broken
+    with pytest.raises(OSError):
+        manager.call_gemini_api("model-a", "[0] Hello")
+    assert manager.limiter.in_flight == 0
+
+def test_failed_call_releases_limiter(manager, provider):
+    manager.limiter = AdaptiveLimiter(initial=2)
+    provider.fail = True
+    with pytest.raises(RuntimeError):
+        manager.call_gemini_api("model-a", "[0] Hello", max_retries=2)
+    assert manager.limiter.in_flight == 0
+    assert len(provider.prompts) == 2
@@ -0,0 +1,76 @@
+import threading
+from conftest import write_srt
+from subtranslator.bulk import LocalBatchProvider, collect_bulk, submit_bulk
+from subtranslator.concurrency import AdaptiveLimiter
+from subtranslator.engine import JobConfig
+from subtranslator.key_store import SQLiteKeyStore
+from subtranslator.translator import load_subtitles
+
+LINES = ["Where were you last night?", "At the station, waiting.", "Why would you do that?"]
+
+def submit(tmp_path, manager):
+    batch_provider = LocalBatchProvider(str(tmp_path / "bulk"), manager, poll_interval=0.01)
+    path = write_srt(tmp_path / "ep.srt", LINES)
+    job_id = submit_bulk(manager, batch_provider, [path], JobConfig("es", "model-a"), directory=str(tmp_path / "bulk"))
+    return batch_provider, job_id
+
+def test_collect_keeps_batch_answer_for_cues_still_suspect(tmp_path, manager, provider):
+    answers = {"Where were you last night?": ["Translation: ¿Dónde estabas?", "Note: ¿Dónde?"],
+               "Why would you do that?": ["Note: ¿Por qué?", "¿Por qué harías eso?"]}
+    provider.translate = lambda text: answers[text].pop(0) if text in answers else "T:" + text
+    batch_provider, job_id = submit(tmp_path, manager)
+    batch_provider.process()
+    out_paths, report = collect_bulk(batch_provider, job_id, str(tmp_path / "out"),
+                                     directory=str(tmp_path / "bulk"), api_manager=manager)
+    subs = load_subtitles(out_paths[0])
+    assert subs[0].text == "Translation: ¿Dónde estabas?"
+    assert subs[1].text == "T:At the station, waiting."
+    assert subs[2].text == "¿Por qué harías eso?"
+    assert report["fixed"] == 1 and report["remaining"] == ["0:0"]
+
+def test_process_leaves_interactive_limiter_alone(tmp_path, manager, provider):
+    manager.limiter = AdaptiveLimiter(initial=2)
+    batch_provider, job_id = submit(tmp_path, manager)
+    assert batch_provider.process() == [job_id]
+    assert manager.limiter.samples == 0
+    assert [result.get("error") for result in batch_provider.results(job_id)] == [None]
+
+def test_process_waits_while_interactive_jobs_are_busy(tmp_path, manager, provider):
+    manager.limiter = AdaptiveLimiter(initial=1)
+    batch_provider, job_id = submit(tmp_path, manager)
+    manager.limiter.acquire()
+    worker = threading.Thread(target=batch_provider.process)
+    worker.start()
+    worker.join(0.2)
+    assert worker.is_alive() and not provider.prompts
+    manager.limiter.release()
+    worker.join(5)
+    assert batch_provider.status(job_id) == "done"
+
+def test_collect_keeps_source_for_empty_answers(tmp_path, manager, provider):
+    provider.translate = lambda text: "" if text == "At the station, waiting." else "T:" + text
+    batch_provider, job_id = submit(tmp_path, manager)
+    batch_provider.process()
+    out_paths, report = collect_bulk(batch_provider, job_id, str(tmp_path / "out"),
+                                     directory=str(tmp_path / "bulk"), api_manager=manager)
+    subs = load_subtitles(out_paths[0])
+    assert [sub.text for sub in subs] == ["T:" + LINES[0], LINES[1], "T:" + LINES[2]]
+    assert report["remaining"] == ["0:1"]
+
+def test_process_waits_while_another_process_holds_a_lease(tmp_path, manager, provider):
+    manager.api_keys = ["k1"]
+    manager.key_store = SQLiteKeyStore(str(tmp_path / "keys.db"))
+    manager.key_store.sync_keys(["k1"])
+    # An interactive job in another process, sharing the key store
+    other = SQLiteKeyStore(str(tmp_path / "keys.db"))
+    other.owner = "elsewhere:1"
+    other.lease(["k1"])
+    batch_provider, job_id = submit(tmp_path, manager)
+    worker = threading.Thread(target=batch_provider.process)
+    worker.start()
+    worker.join(0.2)
+    assert worker.is_alive() and not provider.prompts
+    other.release("k1", success=True)
+    worker.join(5)
+    assert batch_provider.status(job_id) == "done"
+    assert manager.key_store.foreign_leases() == 0
@@ -0,0 +1,30 @@
+import pytest
+from subtranslator.cascade import ModelCascade
+from subtranslator.providers import ProviderResponse
+
+class ScriptedManager:
+    def __init__(self, answers):
+        self.answers = answers  # model: text or exception
+        self.calls = []
+
+    def call_gemini_api(self, model_name, prompt, **kwargs):
+        self.calls.append((model_name, kwargs))
+        answer = self.answers[model_name]
+        if isinstance(answer, Exception):
+            raise answer
+        return ProviderResponse(answer)
+
+def test_malformed_answer_escalates():
+    manager = ScriptedManager({"fast": "[0] uno", "strong": "[0] uno\n[1] dos"})
+    cascade = ModelCascade("fast, strong")
+    assert cascade.translate(manager, "prompt", [0, 1]) == {0: "uno", 1: "dos"}
+    assert cascade.stats()["fast"]["malformed"] == 1
+    assert cascade.stats()["strong"]["served"] == 1
+    # Only the non-final tier has its key retries capped
+    assert manager.calls[0][1]["max_retries"] == 2 and "max_retries" not in manager.calls[1][1]
+
+def test_last_tier_failure_raises():
+    cascade = ModelCascade(["fast", "strong"])
+    with pytest.raises(RuntimeError):
+        cascade.translate(ScriptedManager({"fast": RuntimeError("x"), "strong": RuntimeError("y")}), "p", [0])
+    assert cascade.stats()["strong"]["failed"] == 1
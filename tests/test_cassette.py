@@ -0,0 +1,44 @@
+import gzip
+from subtranslator.cassette import RecordingProvider, ReplayProvider, load_cassette
+
+def record(provider, path, prompts):
+    recorder = RecordingProvider(provider, str(path))
+    for prompt in prompts:
+        recorder.generate(None, "model-a", prompt, system_instruction="rules")
+    return recorder
+
+def members(path):
+    return gzip.open(path).read(), open(path, "rb").read().count(b"\x1f\x8b\x08")
+
+def test_one_gzip_member_per_session(provider, tmp_path):
+    path = tmp_path / "job.jsonl.gz"
+    record(provider, path, ["[0] Hi", "[0] Bye", "[0] Again"]).close()
+    assert members(path)[1] == 1
+    record(provider, path, ["[0] Later"]).close()
+    assert members(path)[1] == 2
+    instructions, records = load_cassette(str(path))
+    assert list(instructions.values()) == ["rules"]
+    assert [r["prompt"] for r in records] == ["[0] Hi", "[0] Bye", "[0] Again", "[0] Later"]
+
+def test_unclosed_recording_is_readable(provider, tmp_path):
+    path = tmp_path / "job.jsonl.gz"
+    recorder = record(provider, path, ["[0] Hi", "[0] Bye"])
+    _, records = load_cassette(str(path))
+    assert len(records) == 2
+    replay = ReplayProvider(str(path), time_scale=0)
+    assert replay.generate(None, "model-a", "[0] Bye", system_instruction="rules").text == "[0] T:Bye"
+    recorder.close()
+
+def test_session_appended_after_unclosed_one(provider, tmp_path):
+    path = tmp_path / "job.jsonl.gz"
+    # Keep the bytes of a session that was never closed, as after os._exit
+    recorder = record(provider, path, ["[0] Hi", "[0] Bye"])
+    unclosed = path.read_bytes()
+    recorder.close()
+    path.write_bytes(unclosed)
+    record(provider, path, ["[0] Later"]).close()
+    instructions, records = load_cassette(str(path))
+    assert list(instructions.values()) == ["rules"]
+    assert [r["prompt"] for r in records] == ["[0] Hi", "[0] Bye", "[0] Later"]
+    replay = ReplayProvider(str(path), time_scale=0)
+    assert replay.generate(None, "model-a", "[0] Later", system_instruction="rules").text == "[0] T:Later"
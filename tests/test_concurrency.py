@@ -0,0 +1,18 @@
+from subtranslator.concurrency import AdaptiveLimiter, is_overload_error
+
+def test_limit_grows_on_healthy_responses_and_halves_on_overload():
+    limiter = AdaptiveLimiter(initial=2, max_limit=4, backoff_interval=0)
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit > 3
+    limit = limiter.limit
+    limiter.acquire()
+    limiter.release(overloaded=True)
+    assert limiter.limit == limit / 2
+    assert limiter.in_flight == 0
+
+def test_overload_errors():
+    assert is_overload_error(RuntimeError("429 Resource exhausted"))
+    assert is_overload_error(TimeoutError("Deadline exceeded"))
+    assert not is_overload_error(ValueError("invalid argument"))
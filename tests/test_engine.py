@@ -0,0 +1,59 @@
+from conftest import make_subs
+from subtranslator.engine import JobConfig, TranslationEngine
+
+def test_cascade_timeout_escalates_slow_model(manager, provider):
+    seen = []
+    generate = provider.generate
+
+    def slow_first_tier(key, model_name, prompt, timeout=None, **kwargs):
+        seen.append((model_name, timeout))
+        if model_name == "fast":
+            raise TimeoutError("deadline exceeded")
+        return generate(key, model_name, prompt, timeout=timeout, **kwargs)
+
+    provider.generate = slow_first_tier
+    subs = make_subs(["Where were you?"])
+    config = JobConfig("es", "fast,strong", cascade_timeout=5.0)
+    result = TranslationEngine(manager).run(subs, config)
+    assert subs[0].text == "T:Where were you?"
+    assert ("fast", 5.0) in seen and ("strong", 5.0) in seen
+    assert result["routing"]["strong"]["served"] == 1
+
+def test_engine_logs_instead_of_printing(manager, provider, capsys, caplog):
+    provider.fail = True
+    subs = make_subs(["Where were you?"])
+    result = TranslationEngine(manager).run(subs, JobConfig("es", "model-a"))
+    assert result["failed_batches"] == 1 and result["untranslated"] == 1
+    assert capsys.readouterr().out == ""
+    assert any("Batch 1 translation failed" in record.message for record in caplog.records)
+
+def test_run_many_packs_first_fit(manager, provider):
+    files = [("a", make_subs(["A" * 60])), ("b", make_subs(["B" * 50])), ("c", make_subs(["C" * 30]))]
+    result = TranslationEngine(manager).run_many(files, JobConfig("es", "model-a", max_chars=100, quality_gate=False))
+    assert result["requests"] == 2
+    packed = sorted(sorted(line.split("]")[0][1:] for line in prompt.splitlines()) for prompt in provider.prompts)
+    assert packed == [["0:0", "2:0"], ["1:0"]]
+    assert [subs[0].text[:3] for _, subs in files] == ["T:A", "T:B", "T:C"]
+
+def test_empty_answer_keeps_source_text(manager, provider):
+    provider.translate = lambda text: "" if text == "Stay here." else "T:" + text
+    subs = make_subs(["Where were you?", "Stay here.", "Fine."])
+    result = TranslationEngine(manager).run(subs, JobConfig("es", "model-a"))
+    assert [sub.text for sub in subs] == ["T:Where were you?", "Stay here.", "T:Fine."]
+    assert result["untranslated"] == 1
+    assert result["quality"]["remaining"] == [1]
+
+def test_run_many_keeps_source_for_empty_answers(manager, provider):
+    provider.translate = lambda text: "" if text == "Stay here." else "T:" + text
+    files = [("a", make_subs(["Stay here."])), ("b", make_subs(["Fine."]))]
+    TranslationEngine(manager).run_many(files, JobConfig("es", "model-a", quality_gate=False))
+    assert [subs[0].text for _, subs in files] == ["Stay here.", "T:Fine."]
+
+def test_memory_is_not_shared_across_censorship_levels(manager, provider, tmp_path):
+    memory_file = str(tmp_path / "tm.db")
+    TranslationEngine(manager).run(make_subs(["Where were you?"]), JobConfig("es", "model-a", memory_file=memory_file))
+    subs = make_subs(["Where were you?"])
+    result = TranslationEngine(manager).run(
+        subs, JobConfig("es", "model-a", censorship_level="high", memory_file=memory_file)
+    )
+    assert result["memory"]["exact"] == 0 and len(provider.prompts) == 2
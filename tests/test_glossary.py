@@ -0,0 +1,22 @@
+from subtranslator.glossary import extract_terms, terms_in
+
+def test_sentence_initial_multiword_name_is_kept():
+    texts = ["New York is huge.", "I moved to New York.", "John met Mary.", "Then John called Mary."]
+    assert sorted(extract_terms(texts)) == ["John", "Mary", "New York"]
+
+def test_sentence_initial_greeting_is_dropped():
+    texts = ["Hey John, wait!", "Where is John?", "Hey John."]
+    assert extract_terms(texts) == ["John"]
+
+def test_ordinary_sentence_starts_are_not_terms():
+    texts = ["Where are you?", "Where is the car?", "Okay. Where now?"]
+    assert extract_terms(texts) == []
+
+def test_terms_in_matches_whole_words():
+    glossary = {"Ann": "Anne", "New York": "Nueva York"}
+    assert terms_in(glossary, ["Annie lives in New York."]) == {"New York": "Nueva York"}
+
+def test_pronoun_contractions_are_not_terms():
+    texts = ["Yes, I'm here.", "Well, I'm not sure.", "No, I'll go.", "And I'll stay.", "So I've seen it, I've said.",
+             "Hey John, wait!", "Where is John?", "Ask O'Neil.", "Call O'Neil."]
+    assert sorted(extract_terms(texts)) == ["John", "O'Neil"]
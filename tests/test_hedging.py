@@ -0,0 +1,29 @@
+import time
+import threading
+from subtranslator.hedging import HedgedCaller
+from subtranslator.providers import ProviderResponse
+
+class SlowFirstManager:
+    api_keys = ["a", "b"]
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def call_gemini_api(self, model_name, prompt, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(0.5 if call == 1 else 0.0)
+        return ProviderResponse(f"answer {call}")
+
+def test_pool_is_sized_from_caller_concurrency():
+    assert HedgedCaller(SlowFirstManager(), concurrency=3)._executor._max_workers == 6
+    assert HedgedCaller(SlowFirstManager(), concurrency=0)._executor._max_workers == 2
+
+def test_slow_request_is_hedged():
+    manager = SlowFirstManager()
+    caller = HedgedCaller(manager, budget=1.0, min_samples=1, min_delay=0.05, concurrency=1)
+    caller.latency.add(0.01)
+    assert caller.call_gemini_api("model-a", "prompt").text == "answer 2"
+    assert caller.stats()["hedge_wins"] == 1
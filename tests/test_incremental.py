@@ -0,0 +1,26 @@
+from conftest import make_subs
+from subtranslator.engine import batch_subtitles, context_lines
+from subtranslator.incremental import translate_revision
+
+OLD = ["Where were you?", "At the station.", "Why?", "I missed the train.", "Again?"]
+
+def test_changed_cue_output_contains_only_that_cue(manager, provider):
+    old_translation = make_subs(["T:" + text for text in OLD])
+    new_texts = list(OLD)
+    new_texts[3] = "I missed the last bus."
+    new_subs = make_subs(new_texts)
+    reused, translated = translate_revision(new_subs, make_subs(OLD), old_translation, "es", manager, "model-a")
+    assert (reused, translated) == (4, 1)
+    assert new_subs[3].text == "T:I missed the last bus."
+    # Neighbours went along as context, not as numbered lines
+    prompt = provider.prompts[0]
+    assert "- At the station.\n- Why?\n" in prompt
+    assert "[3] I missed the last bus.\n" in prompt
+    assert "[2]" not in prompt
+
+def test_batches_carry_only_their_own_text():
+    subs = make_subs(OLD)
+    batches = list(batch_subtitles(subs, context_size=2, indices=[1, 4]))
+    assert batches == [[(1, "At the station."), (4, "Again?")]]
+    texts = [sub.text for sub in subs]
+    assert context_lines(batches[0], texts, 2) == ["Where were you?", "Why?", "I missed the train."]
@@ -0,0 +1,40 @@
+import pytest
+from subtranslator.key_store import SQLiteKeyStore
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteKeyStore(str(tmp_path / "keys.db"))
+    store.sync_keys(["a", "b"])
+    return store
+
+def test_leases_spread_over_keys(store, tmp_path):
+    other = SQLiteKeyStore(str(tmp_path / "keys.db"))
+    assert {store.lease(["a", "b"]), other.lease(["a", "b"])} == {"a", "b"}
+
+def test_quota_failure_cools_key_down(store):
+    key = store.lease(["a", "b"])
+    store.release(key, success=False, error_type="quota")
+    other = "b" if key == "a" else "a"
+    assert store.lease(["a", "b"]) == other
+    store.release(other, success=False, error_type="auth")
+    with pytest.raises(RuntimeError):
+        store.lease(["a", "b"])
+    meta = store.get_meta()
+    assert meta[key]["fail"] == 1 and meta[key]["cooldown_until"]
+
+def test_success_is_counted(store):
+    key = store.lease(["a"])
+    store.release(key, success=True)
+    assert store.get_meta()["a"]["success"] == 1
+
+def test_foreign_leases_skip_own_and_excluded_owners(store, tmp_path):
+    other = SQLiteKeyStore(str(tmp_path / "keys.db"))
+    other.owner = "elsewhere:1"
+    store.lease(["a", "b"])
+    assert store.foreign_leases() == 0
+    assert other.foreign_leases() == 1
+    bulk = SQLiteKeyStore(str(tmp_path / "keys.db"))
+    bulk.owner += ":bulk"
+    bulk.lease(["a", "b"])
+    assert other.foreign_leases() == 2
+    assert other.foreign_leases(exclude_suffix=":bulk") == 1
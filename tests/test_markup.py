@@ -0,0 +1,19 @@
+from subtranslator.markup import mask_markup, placeholders_intact, unmask_markup
+
+def test_wrapping_tags_never_reach_the_prompt():
+    plain, table = mask_markup("<i>Where were you?</i>")
+    assert plain == "Where were you?"
+    assert unmask_markup("¿Dónde estabas?", table) == "<i>¿Dónde estabas?</i>"
+
+def test_inner_markup_and_breaks_round_trip():
+    plain, table = mask_markup("{\\an8}I said <b>no</b>.\nGo home.")
+    assert plain == "I said <1>no<2>.<3>Go home."
+    translated = "Dije <1>que no<2>.<3>Vete a casa."
+    assert placeholders_intact(translated, table)
+    assert unmask_markup(translated, table) == "{\\an8}Dije <b>que no</b>.\nVete a casa."
+
+def test_dropped_placeholder_drops_its_pair():
+    _, table = mask_markup("I said <i>no</i> twice.")
+    translated = "Dije no<2> dos veces."
+    assert not placeholders_intact(translated, table)
+    assert unmask_markup(translated, table) == "Dije no dos veces."
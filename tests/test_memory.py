@@ -0,0 +1,29 @@
+from subtranslator.memory import TranslationMemory, normalize
+
+def test_normalize_keeps_meaningful_marks():
+    assert normalize("- You're leaving...") == normalize("you're leaving…")
+    assert normalize("You're leaving?") != normalize("You're leaving.")
+    assert normalize("Okay, fine.") == normalize("okay fine")
+
+def test_question_is_not_served_a_statement(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), "es")
+    memory.add([("You're leaving.", "Te vas."), ("Thank you, John.", "Gracias, John.")])
+    assert memory.lookup("You're leaving?")[0] != "exact"
+    assert memory.lookup("Thank you, John!")[0] not in ("exact", "substituted")
+    assert memory.lookup("- you're leaving.") == ("exact", "Te vas.")
+
+def test_names_are_substituted(tmp_path):
+    memory = TranslationMemory(str(tmp_path / "tm.db"), "es")
+    memory.add([("Thank you, John.", "Gracias, John.")])
+    assert memory.lookup("Thank you, Mary.") == ("substituted", "Gracias, Mary.")
+
+def test_censorship_levels_and_style_notes_do_not_share_entries(tmp_path):
+    path = str(tmp_path / "tm.db")
+    TranslationMemory(path, "es").add([("Damn it, John.", "Maldita sea, John.")])
+    for memory in (TranslationMemory(path, "es", censorship_level="high"),
+                   TranslationMemory(path, "es", style_notes="Formal register.")):
+        assert memory.lookup("Damn it, John.")[0] not in ("exact", "substituted")
+    censored = TranslationMemory(path, "es", censorship_level="high")
+    censored.add([("Damn it, John.", "Caramba, John.")])
+    assert TranslationMemory(path, "es", censorship_level="high").lookup("Damn it, John.") == ("exact", "Caramba, John.")
+    assert TranslationMemory(path, "es").lookup("Damn it, John.") == ("exact", "Maldita sea, John.")
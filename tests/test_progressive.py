@@ -0,0 +1,15 @@
+import pysrt
+from conftest import make_subs
+from subtranslator.progressive import ProgressiveSRTWriter
+
+def test_file_is_always_a_numbered_prefix(tmp_path):
+    subs = make_subs(["One.", "Two.", "Three.", "Four."])
+    path = str(tmp_path / "out" / "ep.srt")
+    writer = ProgressiveSRTWriter(path)
+    assert open(path).read() == ""
+    assert not writer.add(1, [subs[2], subs[3]])
+    assert open(path).read() == ""
+    assert writer.add(0, [subs[0], subs[1]])
+    written = pysrt.open(path, encoding="utf-8")
+    assert [sub.index for sub in written] == [1, 2, 3, 4]
+    assert [sub.text for sub in written] == ["One.", "Two.", "Three.", "Four."]
@@ -0,0 +1,19 @@
+from subtranslator.prompts import build_chunk_prompt, build_system_instruction, parse_response
+
+def test_parse_response_keeps_plain_and_qualified_ids():
+    text = "Sure!\n[0] Hola\n[2:14] Adiós\n[x] nope\n  [3]  Qué tal "
+    assert parse_response(text) == {0: "Hola", "2:14": "Adiós", 3: "Qué tal"}
+
+def test_chunk_prompt_sections():
+    prompt = build_chunk_prompt([(1, "Hi")], {"John": "Juan"}, {"Hey": "Oye"}, ["Earlier."])
+    assert prompt == (
+        "Glossary:\nJohn = Juan\n\n"
+        "Similar lines translated before (for reference only):\nHey => Oye\n\n"
+        "Earlier lines (context only, do not translate):\n- Earlier.\n\n"
+        "[1] Hi\n"
+    )
+
+def test_system_instruction_is_shared_per_job():
+    instruction = build_system_instruction("French", "mask", style_notes="Informal.", chunk_glossary=True)
+    assert instruction.startswith("Translate the subtitles you are given into French.")
+    assert "####" in instruction and "Glossary" in instruction and "Informal." in instruction
@@ -0,0 +1,49 @@
+import types
+import pytest
+from subtranslator import providers
+from subtranslator.providers import GeminiProvider, ProviderResponse
+
+class FakeCachedModel:
+    def __init__(self, name):
+        self.name = name
+        self.fail_with = None
+
+    def generate_content(self, prompt, safety_settings=None, request_options=None):
+        if self.fail_with:
+            error, self.fail_with = self.fail_with, None
+            raise error
+        return ProviderResponse(self.name)
+
+@pytest.fixture
+def clock(monkeypatch):
+    created = []
+    now = [1000.0]
+
+    class FakeCachedContent:
+        @staticmethod
+        def create(model, system_instruction, ttl):
+            created.append(ttl.total_seconds())
+            return f"cache-{len(created)}"
+
+    monkeypatch.setattr(providers.genai, "configure", lambda api_key: None)
+    monkeypatch.setattr(providers.genai.GenerativeModel, "from_cached_content", staticmethod(FakeCachedModel))
+    monkeypatch.setattr(providers.genai_caching, "CachedContent", FakeCachedContent)
+    monkeypatch.setattr(providers.genai_client, "get_default_generative_client", lambda: None)
+    monkeypatch.setattr(providers, "time", types.SimpleNamespace(time=lambda: now[0]))
+    return now, created
+
+def test_cached_model_is_recreated_before_expiry(clock):
+    now, created = clock
+    provider = GeminiProvider(use_context_cache=True, cache_ttl=600)
+    assert provider.generate("key", "model-a", "hi", system_instruction="rules").text == "cache-1"
+    now[0] += 500
+    assert provider.generate("key", "model-a", "hi", system_instruction="rules").text == "cache-1"
+    now[0] += 60
+    assert provider.generate("key", "model-a", "hi", system_instruction="rules").text == "cache-2"
+    assert created == [600, 600]
+
+def test_missing_cache_is_evicted_and_recreated(clock):
+    provider = GeminiProvider(use_context_cache=True)
+    model = provider.get_model("key", "model-a", "rules")
+    model.fail_with = RuntimeError("404 CachedContent not found (or permission denied)")
+    assert provider.generate("key", "model-a", "hi", system_instruction="rules").text == "cache-2"
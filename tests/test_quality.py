@@ -0,0 +1,39 @@
+import pytest
+from subtranslator.markup import mask_markup
+from subtranslator.quality import QualityReport, check_chunk, check_cue
+
+def check(source, translated, target_lang):
+    masked, table = mask_markup(source)
+    return check_cue(masked, mask_markup(translated)[0], table, target_lang)
+
+@pytest.mark.parametrize("source, translated, lang", [
+    ("Where were you last night?", "你昨晚去哪了？", "zh"),
+    ("Where were you last night, my friend?", "昨夜どこにいたの？", "ja"),
+    ("I don't know what you mean.", "무슨 말인지 모르겠어.", "ko"),
+    ("你昨晚去哪了？", "Where were you last night?", "en"),
+])
+def test_cross_script_lengths_are_not_flagged(source, translated, lang):
+    assert check(source, translated, lang) == []
+
+def test_ordinary_words_are_not_leaks():
+    assert check("Tell me about the movie.", "Cuéntame sobre la translation.", "es") == []
+    assert check("Note: the bus leaves at six.", "Note: el autobús sale a las seis.", "es") == []
+
+@pytest.mark.parametrize("translated", [
+    "Translation: Cuéntamelo.",
+    "<1>Note: informal. Cuéntamelo.",
+    "Cuéntamelo. (Note: informal)",
+    "[3] Cuéntamelo.",
+])
+def test_model_chatter_is_a_leak(translated):
+    assert "leak" in check("Tell me about it.", translated, "es")
+
+def test_chunk_reports_missing_and_suspect_cues():
+    sources = {0: mask_markup("Where were you last night?"), 1: mask_markup("Tell me about it.")}
+    suspects = check_chunk(sources, {0: "Where were you last night?"}, "es")
+    assert suspects == {0: ["untranslated"], 1: ["missing"]}
+    report = QualityReport()
+    report.add(2, suspects, [1], [0])
+    assert report.as_dict() == {
+        "checked": 2, "problems": {"untranslated": 1, "missing": 1}, "requeued": 2, "fixed": 1, "remaining": [0]
+    }
@@ -0,0 +1,22 @@
+from conftest import make_subs
+from subtranslator.segmenter import boundary_score, split_scenes
+
+def test_running_sentence_is_not_a_good_cut():
+    subs = make_subs(["I was going to tell you,", "but you left.", "Fine."])
+    assert boundary_score(subs[0], subs[1]) < 0 < boundary_score(subs[1], subs[2])
+
+def test_batches_stay_within_budget_and_cover_every_cue():
+    texts = [f"Line number {n} is here." if n % 3 else f"And then {n}," for n in range(60)]
+    subs = make_subs(texts)
+    batches = list(split_scenes(subs, max_chars=200))
+    assert [idx for batch in batches for idx, _ in batch] == list(range(60))
+    assert all(sum(len(text) for _, text in batch) <= 200 for batch in batches)
+    # Cuts prefer finished sentences over a trailing comma
+    assert all(not batch[-1][1].endswith(",") for batch in batches[:-1])
+
+def test_long_silence_closes_a_scene():
+    subs = make_subs(["Goodbye.", "See you.", "Morning!", "Hi."], gap=0.5)
+    subs[2].shift(seconds=20)
+    subs[3].shift(seconds=20)
+    batches = list(split_scenes(subs, max_chars=40))
+    assert [[idx for idx, _ in batch] for batch in batches] == [[0, 1], [2, 3]]
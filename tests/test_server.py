@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import http.client
+import threading
+import urllib.request
+from urllib.error import HTTPError
+import pytest
+from conftest import write_srt
+from subtranslator.server import JobQueue, make_server
+
+@pytest.fixture
+def queue_factory(tmp_path, manager):
+    queues = []
+
+    def make(**kwargs):
+        queue = JobQueue(manager, max_workers=1, jobs_file=str(tmp_path / "jobs.json"),
+                         jobs_dir=str(tmp_path / "jobs"), **kwargs)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue._executor.shutdown(wait=True)
+
+def wait_for(queue, job_id):
+    for _ in range(200):
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+SRT = "1\n00:00:01,000 --> 00:00:02,000\nHello there.\n"
+
+@pytest.mark.parametrize("lang", ["../../evil", "fr/de", "", "French.", " fr", "x" * 41, None, 5])
+def test_rejects_unsafe_target_language(queue_factory, lang):
+    queue = queue_factory()
+    with pytest.raises(ValueError):
+        queue.submit([lang], "model-a", srt_text=SRT)
+    assert not queue.list()
+
+def test_result_is_written_inside_job_dir(queue_factory):
+    queue = queue_factory()
+    job = wait_for(queue, queue.submit(["pt-BR"], "model-a", srt_text=SRT))
+    assert job["status"] == "done"
+    assert os.path.dirname(job["outputs"]["pt-BR"]) == os.path.dirname(job["input"])
+
+def test_language_names_are_slugged_into_file_names(queue_factory):
+    queue = queue_factory()
+    job = wait_for(queue, queue.submit(["Brazilian Portuguese", "fr"], "model-a", srt_text=SRT))
+    assert job["status"] == "done"
+    assert os.path.basename(job["outputs"]["Brazilian Portuguese"]) == "result-brazilian-portuguese.srt"
+    with pytest.raises(ValueError):
+        queue.submit(["French", "french"], "model-a", srt_text=SRT)
+
+def test_paths_disabled_without_input_root(queue_factory, tmp_path):
+    path = write_srt(tmp_path / "a.srt", ["Hello there."])
+    with pytest.raises(ValueError):
+        queue_factory().submit(["fr"], "model-a", path=path)
+
+def test_paths_confined_to_input_root(queue_factory, tmp_path):
+    root = tmp_path / "root"
+    root.mkdir()
+    write_srt(root / "a.srt", ["Hello there."])
+    secret = tmp_path / "secret.srt"
+    secret.write_text(SRT)
+    os.symlink(secret, root / "link.srt")
+    queue = queue_factory(input_root=str(root))
+    for path in (str(secret), "../secret.srt", "link.srt"):
+        with pytest.raises(ValueError):
+            queue.submit(["fr"], "model-a", path=path)
+    assert wait_for(queue, queue.submit(["fr"], "model-a", path="a.srt"))["status"] == "done"
+
+def test_http_api_round_trip(queue_factory):
+    server = make_server(port=0, queue=queue_factory())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        request = urllib.request.Request(
+            base + "/jobs", data=json.dumps({"srt": SRT, "target_langs": ["fr"], "model": "m"}).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        job_id = json.load(urllib.request.urlopen(request))["id"]
+        wait_for(server.RequestHandlerClass.queue, job_id)
+        result = urllib.request.urlopen(f"{base}/jobs/{job_id}/result").read().decode()
+        assert "T:Hello there." in result
+
+        bad = urllib.request.Request(base + "/jobs?target_lang=../x&model=m", data=SRT.encode())
+        try:
+            urllib.request.urlopen(bad)
+            raise AssertionError("expected 400")
+        except HTTPError as e:
+            assert e.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+@pytest.mark.parametrize("body", [
+    [{"srt": SRT}],
+    {"srt": SRT, "target_langs": ["fr"], "model": "m", "censorship": ["x"]},
+    {"path": 5, "target_langs": ["fr"], "model": "m"},
+    {"srt": 5, "target_langs": ["fr"], "model": "m"},
+    {"srt": SRT, "target_langs": 5, "model": "m"},
+    {"srt": SRT, "target_langs": ["fr"], "model": ["m"]},
+])
+def test_malformed_json_requests_get_400(queue_factory, body):
+    server = make_server(port=0, queue=queue_factory())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server.server_address[1]}/jobs", data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"}
+        )
+        with pytest.raises(HTTPError) as error:
+            urllib.request.urlopen(request)
+        assert error.value.code == 400
+        assert not server.RequestHandlerClass.queue.list()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_non_numeric_content_length_gets_400(queue_factory):
+    server = make_server(port=0, queue=queue_factory())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1])
+        connection.putrequest("POST", "/jobs")
+        connection.putheader("Content-Length", "abc")
+        connection.endheaders()
+        assert connection.getresponse().status == 400
+    finally:
+        server.shutdown()
+        server.server_close()
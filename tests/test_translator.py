@@ -0,0 +1,17 @@
+import os
+from conftest import write_srt
+from subtranslator.translator import output_paths, translate_files, load_subtitles
+
+def test_output_paths_keep_distinct_folders(tmp_path):
+    paths = output_paths([str(tmp_path / "s1" / "ep01.srt"), str(tmp_path / "s2" / "ep01.srt")], "out")
+    assert paths == [os.path.join("out", "s1", "ep01_translated.srt"), os.path.join("out", "s2", "ep01_translated.srt")]
+    assert output_paths([str(tmp_path / "ep01.srt")], "out") == [os.path.join("out", "ep01_translated.srt")]
+
+def test_same_basename_inputs_do_not_overwrite(tmp_path, manager):
+    (tmp_path / "s1").mkdir()
+    (tmp_path / "s2").mkdir()
+    inputs = [write_srt(tmp_path / "s1" / "ep.srt", ["First show."]),
+              write_srt(tmp_path / "s2" / "ep.srt", ["Second show."])]
+    out_paths, _ = translate_files(inputs, "es", manager, "model-a", str(tmp_path / "out"))
+    assert len(set(out_paths)) == 2
+    assert [load_subtitles(path)[0].text for path in out_paths] == ["T:First show.", "T:Second show."]
@@ -0,0 +1,81 @@
+import os
+from conftest import write_srt
+from subtranslator.watcher import FolderWatcher
+
+def make_watcher(tmp_path, manager, **kwargs):
+    return FolderWatcher(
+        [str(tmp_path / "in")], str(tmp_path / "out"), "es", "model-a", api_manager=manager,
+        state_file=str(tmp_path / "state.json"), **kwargs
+    )
+
+def test_translated_file_is_done(tmp_path, manager):
+    watcher = make_watcher(tmp_path, manager)
+    path = write_srt(tmp_path / "a.srt", ["Hello there.", "How are you?"])
+    assert watcher._process(path)
+    assert watcher.state[path]["status"] == "done"
+    assert watcher._is_done(path, watcher._signature(path))
+
+def test_partial_translation_is_not_done(tmp_path, manager, provider):
+    # The model drops every answer, so no cue is covered
+    provider.translate = lambda text: ""
+    watcher = make_watcher(tmp_path, manager)
+    path = write_srt(tmp_path / "a.srt", ["Hello there.", "How are you?"])
+    assert watcher._process(path) is None
+    assert watcher.state[path]["status"] == "failed"
+
+def test_failed_file_backs_off_then_gives_up(tmp_path, manager, provider):
+    provider.fail = True
+    watcher = make_watcher(tmp_path, manager, max_attempts=2, retry_delay=0.0)
+    path = write_srt(tmp_path / "a.srt", ["Hello there."])
+    signature = watcher._signature(path)
+    watcher._process(path)
+    assert watcher.state[path]["attempts"] == 1
+    assert not watcher._is_done(path, signature)
+    watcher._process(path)
+    assert watcher.state[path]["attempts"] == 2
+    assert watcher._is_done(path, signature)
+
+    watcher.retry_delay = 3600.0
+    watcher.max_attempts = 5
+    assert watcher._is_done(path, signature)
+
+def test_changed_file_is_retried(tmp_path, manager, provider):
+    provider.fail = True
+    watcher = make_watcher(tmp_path, manager, max_attempts=1)
+    path = write_srt(tmp_path / "a.srt", ["Hello there."])
+    watcher._process(path)
+    assert watcher._is_done(path, watcher._signature(path))
+    write_srt(tmp_path / "a.srt", ["Hello there, again."])
+    os.utime(path, (1, 1))
+    assert not watcher._is_done(path, watcher._signature(path))
+
+def test_same_name_in_two_watch_dirs_does_not_collide(tmp_path, manager):
+    (tmp_path / "A").mkdir()
+    (tmp_path / "B").mkdir()
+    watcher = FolderWatcher(
+        [str(tmp_path / "A"), str(tmp_path / "B")], str(tmp_path / "out"), "es", "model-a",
+        api_manager=manager, state_file=str(tmp_path / "state.json")
+    )
+    first = watcher._process(write_srt(tmp_path / "A" / "ep01.srt", ["Hello there."]))
+    second = watcher._process(write_srt(tmp_path / "B" / "ep01.srt", ["Goodbye."]))
+    assert first == str(tmp_path / "out" / "A" / "ep01_translated.srt")
+    assert second == str(tmp_path / "out" / "B" / "ep01_translated.srt")
+
+def test_single_watch_dir_writes_into_output_dir(tmp_path, manager):
+    watcher = make_watcher(tmp_path, manager)
+    (tmp_path / "in").mkdir()
+    out_path = watcher._process(write_srt(tmp_path / "in" / "ep01.srt", ["Hello there."]))
+    assert out_path == str(tmp_path / "out" / "ep01_translated.srt")
+
+def test_failed_progressive_output_is_removed(tmp_path, manager, provider):
+    provider.translate = lambda text: "" if text == "How are you?" else "T:" + text
+    watcher = make_watcher(tmp_path, manager, progressive=True)
+    (tmp_path / "in").mkdir()
+    assert watcher._process(write_srt(tmp_path / "in" / "ep01.srt", ["Hello there.", "How are you?"])) is None
+    assert not os.path.exists(tmp_path / "out") or os.listdir(tmp_path / "out") == []
+
+def test_progressive_run_leaves_only_the_final_file(tmp_path, manager):
+    watcher = make_watcher(tmp_path, manager, progressive=True)
+    (tmp_path / "in").mkdir()
+    watcher._process(write_srt(tmp_path / "in" / "ep01.srt", ["Hello there."]))
+    assert os.listdir(tmp_path / "out") == ["ep01_translated.srt"]